@@ -1,29 +1,74 @@
 import numpy as np
 import random
 import pickle
+from array import array
 
 class QLearningAgent:
     def __init__(self, state_size, action_size, alpha=0.1, gamma=0.9, epsilon=0.2):
-        self.q_table = {}
         self.state_size = state_size
         self.action_size = action_size
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
+        # One row of Q-values per cell index (row * cols + col)
+        self.set_q_table(np.zeros((int(np.prod(state_size)), action_size)))
+
+    def set_q_table(self, q_table):
+        # learn() keeps each row's greedy action and max Q-value up to date, so the
+        # table must only be replaced through here
+        self.q_table = q_table
+        self._q = memoryview(q_table).cast('B').cast('d')  # flat view for fast scalar access
+        self._refresh_greedy()
+
+    def _refresh_greedy(self):
+        self._best = self.q_table.argmax(axis=1).tolist()
+        self._max = self.q_table.max(axis=1).tolist()
 
     def get_qs(self, state):
-        return self.q_table.setdefault(state, [0] * self.action_size)
+        return self.q_table[state]
 
     def choose_action(self, state):
-        if random.uniform(0, 1) < self.epsilon:
+        if random.random() < self.epsilon:
             return random.randint(0, self.action_size - 1)
-        return int(np.argmax(self.get_qs(state)))
+        return self._best[state]
 
     def learn(self, state, action, reward, next_state):
-        current_q = self.get_qs(state)[action]
-        max_next_q = max(self.get_qs(next_state))
-        new_q = (1 - self.alpha) * current_q + self.alpha * (reward + self.gamma * max_next_q)
-        self.q_table[state][action] = new_q
+        i = state * self.action_size + action
+        new_q = (1 - self.alpha) * self._q[i] + self.alpha * (reward + self.gamma * self._max[next_state])
+        self._q[i] = new_q
+        self._update_best(state, action, new_q)
+
+    def _update_best(self, state, action, new_q):
+        best = self._best[state]
+        if action == best:
+            if new_q >= self._max[state]:
+                self._max[state] = new_q
+                return
+            # The greedy action got worse, so rescan its row
+            best = int(self.q_table[state].argmax())
+            self._best[state] = best
+            self._max[state] = float(self.q_table[state, best])
+        elif new_q > self._max[state] or (new_q == self._max[state] and action < best):
+            # Ties go to the lowest action, as with np.argmax
+            self._best[state] = action
+            self._max[state] = new_q
+
+    def choose_actions(self, states, rng):
+        # Epsilon-greedy actions for a batch of states, e.g. BatchedFloorIsLavaEnv.states
+        actions = self.q_table[states].argmax(axis=1)
+        explore = rng.random(len(states)) < self.epsilon
+        actions[explore] = rng.integers(0, self.action_size, np.count_nonzero(explore))
+        return actions
+
+    def learn_batch(self, states, actions, rewards, next_states, dones):
+        max_next_q = np.where(dones, 0.0, self.q_table[next_states].max(axis=1))
+        flat = self.q_table.reshape(-1)
+        keys = states * self.action_size + actions
+        errors = rewards + self.gamma * max_next_q - flat[keys]
+        # A (state, action) pair that occurs several times in the batch moves by its mean error
+        keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        flat[keys] += self.alpha * np.bincount(inverse, errors) / counts
+        self._refresh_greedy()
 
     def save(self, filename="q_table.pkl"):
         with open(filename, "wb") as f:
@@ -31,4 +76,101 @@ class QLearningAgent:
 
     def load(self, filename="q_table.pkl"):
         with open(filename, "rb") as f:
-            self.q_table = pickle.load(f)
+            q_table = pickle.load(f)
+        # Older files hold a dict of (row, col) -> list of Q-values
+        if isinstance(q_table, dict):
+            cols = self.state_size[1]
+            dense = np.zeros((int(np.prod(self.state_size)), self.action_size))
+            for (row, col), qs in q_table.items():
+                dense[row * cols + col] = qs
+            q_table = dense
+        self.set_q_table(np.ascontiguousarray(q_table, dtype=np.float64))
+
+class SparseQLearningAgent(QLearningAgent):
+    # QLearningAgent for large grids: Q-rows exist only for the cells passed as `cells`
+    # (e.g. the reachable set) and the ones the agent actually visits, so memory grows
+    # with those instead of with size ** 2 * actions. Unallocated cells read as all zeros.
+    def __init__(self, state_size, action_size, alpha=0.1, gamma=0.9, epsilon=0.2, cells=None):
+        self.state_size = state_size
+        self.action_size = action_size
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.index = array('i', [-1]) * int(np.prod(state_size))  # cell -> row, -1 if none
+        self.cells = []  # row -> cell
+        self.set_q_table(np.zeros((16, action_size)))
+        if cells is not None:
+            for cell in cells:
+                self._row(int(cell))
+
+    def _row(self, state):
+        row = self.index[state]
+        if row >= 0:
+            return row
+        row = len(self.cells)
+        if row == len(self.q_table):
+            grown = np.zeros((2 * row, self.action_size))
+            grown[:row] = self.q_table
+            self.set_q_table(grown)
+        self.index[state] = row
+        self.cells.append(state)
+        return row
+
+    def nbytes(self):
+        return self.index.itemsize * len(self.index) + self.q_table[:len(self.cells)].nbytes
+
+    def get_qs(self, state):
+        row = self.index[state]
+        return self.q_table[row] if row >= 0 else np.zeros(self.action_size)
+
+    def choose_action(self, state):
+        if random.random() < self.epsilon:
+            return random.randint(0, self.action_size - 1)
+        row = self.index[state]
+        return self._best[row] if row >= 0 else 0
+
+    def learn(self, state, action, reward, next_state):
+        next_row = self.index[next_state]
+        max_next_q = self._max[next_row] if next_row >= 0 else 0.0
+        row = self._row(state)
+        i = row * self.action_size + action
+        new_q = (1 - self.alpha) * self._q[i] + self.alpha * (reward + self.gamma * max_next_q)
+        self._q[i] = new_q
+        self._update_best(row, action, new_q)
+
+    def _rows(self, states):
+        # Table row of each state, -1 where none is allocated
+        return np.frombuffer(self.index, dtype=np.intc)[states]
+
+    def choose_actions(self, states, rng):
+        rows = self._rows(states)
+        actions = np.where(rows >= 0, self.q_table[np.maximum(rows, 0)].argmax(axis=1), 0)
+        explore = rng.random(len(states)) < self.epsilon
+        actions[explore] = rng.integers(0, self.action_size, np.count_nonzero(explore))
+        return actions
+
+    def learn_batch(self, states, actions, rewards, next_states, dones):
+        next_rows = self._rows(next_states)
+        max_next_q = np.where(dones | (next_rows < 0), 0.0, self.q_table[np.maximum(next_rows, 0)].max(axis=1))
+        for state in np.unique(states).tolist():
+            self._row(state)
+        flat = self.q_table.reshape(-1)
+        keys = self._rows(states) * self.action_size + actions
+        errors = rewards + self.gamma * max_next_q - flat[keys]
+        keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        flat[keys] += self.alpha * np.bincount(inverse, errors) / counts
+        self._refresh_greedy()
+
+    def save(self, filename="q_table.pkl"):
+        with open(filename, "wb") as f:
+            pickle.dump({'cells': np.array(self.cells), 'q_table': self.q_table[:len(self.cells)]}, f)
+
+    def load(self, filename="q_table.pkl"):
+        with open(filename, "rb") as f:
+            data = pickle.load(f)
+        self.index = array('i', [-1]) * len(self.index)
+        self.cells = []
+        self.set_q_table(np.zeros((max(16, len(data['cells'])), self.action_size)))
+        for cell, qs in zip(data['cells'].tolist(), data['q_table']):
+            self.q_table[self._row(cell)] = qs
+        self._refresh_greedy()
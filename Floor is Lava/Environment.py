@@ -2,43 +2,190 @@ import numpy as np
 import random
 import os
 
+# Tile codes stored in the grid
+LAVA, LAND, START, DEST = 0, 1, 2, 3
+TILE_CHARS = 'LGSD'
+
+ACTIONS = {
+    0: (-1, 0),  # up
+    1: (1, 0),   # down
+    2: (0, -1),  # left
+    3: (0, 1),   # right
+    4: (-2, 0),  # jump up
+    5: (2, 0),   # jump down
+    6: (0, -2),  # jump left
+    7: (0, 2),   # jump right
+}
+
+def transition_tables(grids, size):
+    # For every (cell, action): the cell the agent lands on, the reward it gets there apart
+    # from the first-visit bonus (which depends on the episode so far), whether it earns
+    # that bonus and whether the episode ends. grids may have leading batch dimensions;
+    # the landing cell only depends on the board size, so it has none.
+    cells = size * size
+    rows, cols = np.divmod(np.arange(cells), size)
+    moves = np.array([ACTIONS[a] for a in range(len(ACTIONS))])
+    new_x = rows[:, None] + moves[:, 0]
+    new_y = cols[:, None] + moves[:, 1]
+    valid = (new_x >= 0) & (new_x < size) & (new_y >= 0) & (new_y < size)
+    next_state = np.where(valid, new_x * size + new_y, np.arange(cells)[:, None]).astype(np.int32)
+
+    tiles = grids.reshape(grids.shape[:-2] + (cells,))[..., next_state]
+    jump = np.arange(len(ACTIONS)) > 3
+    visit_bonus = valid & ((tiles == LAND) | (tiles == START))
+    base_reward = (np.where(jump, -2, -1) + valid * np.select(
+        [tiles == LAVA, visit_bonus & jump, tiles == DEST], [-10, 10, 100], 0)).astype(np.int16)
+    return next_state, base_reward, visit_bonus, valid & (tiles == DEST)
+
+def reachable_cells(grids):
+    # Cells reachable from the start without stepping on lava, using all 8 moves. Flood
+    # fill one move at a time over the whole board; grids may have leading batch dimensions
+    size = grids.shape[-1]
+    walkable = grids != LAVA
+    reached = np.zeros_like(walkable)
+    reached[..., 0, 0] = walkable[..., 0, 0]
+    frontier = reached.copy()
+    while frontier.any():
+        spread = np.zeros_like(walkable)
+        for dx, dy in ACTIONS.values():
+            spread[..., max(dx, 0):size + min(dx, 0), max(dy, 0):size + min(dy, 0)] |= \
+                frontier[..., max(-dx, 0):size - max(dx, 0), max(-dy, 0):size - max(dy, 0)]
+        frontier = spread & walkable & ~reached
+        reached |= frontier
+    return reached
+
+def is_solvable(grids):
+    # Whether D can be reached without stepping on lava, per grid
+    solvable = reachable_cells(grids)[..., -1, -1]
+    return bool(solvable) if solvable.ndim == 0 else solvable
+
+def carve_routes(grids, rng):
+    # Turn a random route of 1- and 2-cell moves down and right from S to D into land in
+    # each of the (count, size, size) grids, making them all solvable
+    size = grids.shape[-1]
+    envs = np.arange(len(grids))
+    x = np.zeros(len(grids), dtype=int)
+    y = np.zeros(len(grids), dtype=int)
+    moving = np.ones(len(grids), dtype=bool)
+    while moving.any():
+        down = np.where(x == size - 1, False, np.where(y == size - 1, True, rng.random(len(grids)) < 0.5))
+        step = rng.integers(1, 3, len(grids))
+        x = np.where(moving & down, np.minimum(x + step, size - 1), x)
+        y = np.where(moving & ~down, np.minimum(y + step, size - 1), y)
+        lava = grids[envs, x, y] == LAVA
+        grids[envs[lava], x[lava], y[lava]] = LAND
+        moving = (x < size - 1) | (y < size - 1)
+
+def make_solvable(grids, rng):
+    # Carve a route through the grids (count, size, size) that have no lava-free one
+    unsolvable = np.flatnonzero(~is_solvable(grids))
+    if len(unsolvable):
+        routes = grids[unsolvable]
+        carve_routes(routes, rng)
+        grids[unsolvable] = routes
+    return grids
+
+def generate_grid(size, land_density=0.3, rng=None):
+    # Solvable size x size grid where each other tile is land with probability land_density
+    rng = np.random.default_rng(rng)
+    grid = np.where(rng.random((size, size)) < land_density, LAND, LAVA).astype(np.int8)
+    grid[0, 0] = START
+    grid[size - 1, size - 1] = DEST
+    return make_solvable(grid[None], rng)[0]
+
+def generate_grids(count, size=8, rng=None):
+    # Vectorized reset_grid: count random solvable layouts as a (count, size, size) array
+    rng = np.random.default_rng(rng)
+    return make_solvable(draw_grids(count, size, rng), rng)
+
+def draw_grids(count, size, rng):
+    envs = np.arange(count)
+    grids = np.full((count, size, size), LAVA, dtype=np.int8)
+    grids[:, 0, 0] = START
+    grids[:, size - 1, size - 1] = DEST
+
+    # Ensure destination has at least one land neighbor
+    above = rng.random(count) < 0.5
+    grids[envs, np.where(above, size - 2, size - 1), np.where(above, size - 1, size - 2)] = LAND
+
+    # Between 8 and 15 land blocks of length 1 or 2; turning lava into land commutes, so
+    # all blocks can be drawn at once
+    blocks = rng.integers(8, 16, count)
+    x = rng.integers(0, size, (count, 15))
+    y = rng.integers(0, size, (count, 15))
+    horizontal = rng.random((count, 15)) < 0.5
+    length = rng.integers(1, 3, (count, 15))
+    active = np.arange(15) < blocks[:, None]
+    for i in range(2):
+        xi, yi = x + i * ~horizontal, y + i * horizontal
+        ok = active & (i < length) & (xi < size) & (yi < size)
+        e, xi, yi = np.broadcast_to(envs[:, None], ok.shape)[ok], xi[ok], yi[ok]
+        lava = grids[e, xi, yi] == LAVA
+        grids[e[lava], xi[lava], yi[lava]] = LAND
+    return grids
+
 class FloorIsLavaEnv:
-    def __init__(self, size=8, grid_file="saved_grid.npy"):
+    def __init__(self, size=8, grid_file=None, land_density=None):
         self.size = size
-        self.grid_file = grid_file
-        self.actions = {
-            0: (-1, 0),  # up
-            1: (1, 0),   # down
-            2: (0, -1),  # left
-            3: (0, 1),   # right
-            4: (-2, 0),  # jump up
-            5: (2, 0),   # jump down
-            6: (0, -2),  # jump left
-            7: (0, 2),   # jump right
-        }
-
-        # If saved grid exists, load it. Else, generate new and save it.
-        if os.path.exists(self.grid_file):
-            self.grid = np.load(self.grid_file)
+        self.grid_file = grid_file or self.default_grid_file(size, land_density)
+        self.land_density = land_density  # None keeps the original 8-15 land blocks
+        self.actions = ACTIONS
+
+        # If a saved grid of this size exists, load it. Else, generate new and save it.
+        grid = self.to_codes(np.load(self.grid_file)) if os.path.exists(self.grid_file) else None
+        if grid is not None and grid.shape == (size, size):
+            self.grid = grid
+            if not is_solvable(self.grid):
+                make_solvable(self.grid[None], np.random.default_rng(random.getrandbits(64)))
+                np.save(self.grid_file, self.grid)
         else:
+            # A file holding another size is left alone
             self.reset_grid()
-            np.save(self.grid_file, self.grid)
+            if grid is None:
+                np.save(self.grid_file, self.grid)
 
+        self.compile()
         self.reset()
 
+    @staticmethod
+    def default_grid_file(size, land_density=None):
+        # The original 8x8 layout keeps its old file name
+        if size == 8 and land_density is None:
+            return "saved_grid.npy"
+        density = "" if land_density is None else f"_d{land_density:g}"
+        return f"saved_grid_{size}{density}.npy"
+
+    @staticmethod
+    def to_codes(grid):
+        # Grids saved before tile codes were introduced hold 'L'/'G'/'S'/'D' strings
+        if grid.dtype.kind != 'U':
+            return grid.astype(np.int8)
+        codes = np.zeros(grid.shape, dtype=np.int8)
+        for code, char in enumerate(TILE_CHARS):
+            codes[grid == char] = code
+        return codes
+
     def reset_grid(self):
-        self.grid = np.full((self.size, self.size), 'L')
+        if self.land_density is not None:
+            self.grid = generate_grid(self.size, self.land_density, random.getrandbits(64))
+        else:
+            self.draw_blocks()
+            make_solvable(self.grid[None], np.random.default_rng(random.getrandbits(64)))
+        self.compile()
+
+    def draw_blocks(self):
+        self.grid = np.full((self.size, self.size), LAVA, dtype=np.int8)
 
         # Start and Destination
-        self.grid[0][0] = 'S'
-        self.grid[self.size - 1][self.size - 1] = 'D'
+        self.grid[0][0] = START
+        self.grid[self.size - 1][self.size - 1] = DEST
 
         # Ensure destination has at least one land neighbor
         dest_neighbors = [(self.size - 2, self.size - 1), (self.size - 1, self.size - 2)]
         random.shuffle(dest_neighbors)
         for nx, ny in dest_neighbors:
             if 0 <= nx < self.size and 0 <= ny < self.size:
-                self.grid[nx][ny] = 'G'
+                self.grid[nx][ny] = LAND
                 break
 
         # Generate random land blocks
@@ -55,50 +202,104 @@ class FloorIsLavaEnv:
                     yi = y + i
                 else:
                     xi = x + i
-                if 0 <= xi < self.size and 0 <= yi < self.size and self.grid[xi][yi] == 'L':
-                    self.grid[xi][yi] = 'G'
+                if 0 <= xi < self.size and 0 <= yi < self.size and self.grid[xi][yi] == LAVA:
+                    self.grid[xi][yi] = LAND
+
+    def compile(self):
+        self.next_state, self.base_reward, self.visit_bonus, self.terminal = transition_tables(self.grid, self.size)
+        # step() reads one (next state, reward, bonus, done) tuple; a list of tuples is much
+        # faster than NumPy arrays for these scalar reads. Rows are built on a cell's first
+        # visit, so large grids only pay for the cells the agent reaches
+        self._transitions = [None] * (self.size * self.size)
+
+    def _transition_row(self, state):
+        row = list(zip(self.next_state[state].tolist(), self.base_reward[state].tolist(),
+                       self.visit_bonus[state].tolist(), self.terminal[state].tolist()))
+        self._transitions[state] = row
+        return row
 
     def reset(self):
-        self.agent_pos = [0, 0]
-        self.prev_pos = None
-        self.visited = set()
-        self.visited.add(tuple(self.agent_pos))
-        return tuple(self.agent_pos)
+        self.state = 0
+        self.visited = bytearray(self.size * self.size)
+        self.visited[self.state] = True
+        return self.state
+
+    @property
+    def agent_pos(self):
+        return divmod(self.state, self.size)
 
     def is_valid(self, x, y):
         return 0 <= x < self.size and 0 <= y < self.size
 
     def step(self, action):
-        move = self.actions[action]
-        new_x = self.agent_pos[0] + move[0]
-        new_y = self.agent_pos[1] + move[1]
-
-        reward = -1 if action <= 3 else -2
-        done = False
+        # States are cell indices, row * size + col
+        row = self._transitions[self.state] or self._transition_row(self.state)
+        new_state, reward, bonus, done = row[action]
+        if bonus and not self.visited[new_state]:
+            reward += 1
+        self.visited[new_state] = True
+        self.state = new_state
+        return new_state, reward, done
 
-        if self.is_valid(new_x, new_y):
-            new_pos = (new_x, new_y)
-            tile = self.grid[new_x][new_y]
-
-            if new_pos == tuple(self.agent_pos):
-                reward += -1  # penalty for not moving
+    def get_grid(self):
+        visited = np.frombuffer(self.visited, dtype=np.uint8).reshape(self.size, self.size).astype(bool)
+        return self.grid, self.agent_pos, visited
 
-            if tile == 'L':
-                reward += -10
-            elif tile in ['G', 'S']:
-                if action > 3:
-                    reward += 10
-                if new_pos not in self.visited:
-                    reward += 1
-            elif tile == 'D':
-                reward += 100
-                done = True
+class BatchedFloorIsLavaEnv:
+    # Steps num_envs independent layouts at once; states, rewards and dones are (num_envs,)
+    # arrays. Finished envs are reset straight away and, with new_layouts, get a fresh grid.
+    # QLearningAgent's table is keyed by cell only, so learn_batch learns a policy for one
+    # layout when every env plays the same grid (pass grid); over different layouts it
+    # learns their average, which is no policy for any of them.
+    def __init__(self, num_envs, size=8, seed=None, new_layouts=False, grid=None, max_steps=200):
+        if grid is not None and new_layouts:
+            raise ValueError("new_layouts would replace the shared grid")
+        self.num_envs = num_envs
+        self.size = size
+        self.new_layouts = new_layouts
+        self.max_steps = max_steps  # episodes that have not reached D by then are cut off
+        self.rng = np.random.default_rng(seed)
+        if grid is None:
+            self.grids = generate_grids(num_envs, size, self.rng)
+        else:
+            self.grids = np.repeat(np.asarray(grid, dtype=np.int8)[None], num_envs, axis=0)
+        self.next_state, self.base_reward, self.visit_bonus, self.terminal = transition_tables(self.grids, size)
+        self.layouts = num_envs  # grids generated so far
+        self._envs = np.arange(num_envs)
+        self.reset()
 
-            self.prev_pos = tuple(self.agent_pos)
-            self.agent_pos = [new_x, new_y]
-            self.visited.add(tuple(self.agent_pos))
+    def reset(self):
+        self.states = np.zeros(self.num_envs, dtype=np.int64)
+        self.steps = np.zeros(self.num_envs, dtype=np.int64)
+        self.visited = np.zeros((self.num_envs, self.size * self.size), dtype=bool)
+        self.visited[:, 0] = True
+        return self.states.copy()
 
-        return tuple(self.agent_pos), reward, done
+    def step(self, actions):
+        # Returns the cells the agents landed on, so learners can bootstrap from them where
+        # an episode was only cut off by max_steps; dones is set where D was reached. Envs
+        # that finished either way are reset, and self.states holds where every env
+        # continues from, which is what the next actions should be chosen for
+        envs, states = self._envs, self.states
+        next_states = self.next_state[states, actions]
+        rewards = self.base_reward[envs, states, actions] + (
+            self.visit_bonus[envs, states, actions] & ~self.visited[envs, next_states])
+        dones = self.terminal[envs, states, actions]
+        self.visited[envs, next_states] = True
+        self.steps += 1
+        finished = dones | (self.steps >= self.max_steps)
+        self.states = next_states.copy()
+        if finished.any():
+            self.reset_envs(np.flatnonzero(finished))
+        return next_states, rewards, dones
 
-    def get_grid(self):
-        return self.grid, tuple(self.agent_pos), self.visited
+    def reset_envs(self, envs):
+        if self.new_layouts:
+            self.grids[envs] = generate_grids(len(envs), self.size, self.rng)
+            _, self.base_reward[envs], self.visit_bonus[envs], self.terminal[envs] = transition_tables(
+                self.grids[envs], self.size)
+            self.layouts += len(envs)
+        self.states[envs] = 0
+        self.steps[envs] = 0
+        self.visited[envs] = False
+        self.visited[envs, 0] = True
@@ -1,52 +1,96 @@
-from Environment import FloorIsLavaEnv
+from Environment import FloorIsLavaEnv, LAND
 from Agent import QLearningAgent
+from Planner import value_iteration, reaches_goal
+import argparse
+import hashlib
+import os
+import tempfile
+import numpy as np
+import sys
 import tkinter as tk
 
 CELL_SIZE = 60
 EPISODES = 5000
+CACHE_DIR = "policy_cache"
+# Bump when the env's rewards or transitions or the training loop change, so Q-tables
+# cached under the old rules are not loaded
+CACHE_VERSION = 2
 
-env = FloorIsLavaEnv()
-agent = QLearningAgent(state_size=(8, 8), action_size=8)
-
-episode_stats = []  # To store all results
+def cache_file(env, agent, episodes, plan, cache_dir=CACHE_DIR):
+    # Trained Q-tables are keyed by the grid's contents and everything that shapes training
+    settings = (CACHE_VERSION, env.size, agent.alpha, agent.gamma, agent.epsilon, episodes, plan)
+    key = hashlib.sha256(env.grid.tobytes() + repr(settings).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"q_table_{key}.pkl")
 
 # ---------- Training ----------
-for episode in range(EPISODES):
-    state = env.reset()
-    done = False
-    total_reward = 0
-    steps = 0
-    while not done:
-        action = agent.choose_action(state)
-        next_state, reward, done = env.step(action)
-        agent.learn(state, action, reward, next_state)
-        state = next_state
-        total_reward += reward
-        steps += 1
-
-    # Check if agent reached the destination
-    reached_goal = state == (env.size - 1, env.size - 1)
-    episode_stats.append((episode + 1, total_reward, steps, reached_goal))
-
-    # Print key stats every 500 episodes
-    if (episode + 1) % 500 == 0:
-        print(f"Episode {episode + 1:4d} | Reward: {total_reward:5.1f} | Steps: {steps:3d} | {'Success' if reached_goal else 'Failed'}")
-
-# ---------- Final Summary ----------
-print("\n=== FINAL EPISODE STATS SUMMARY ===")
-successes = [e for e in episode_stats if e[3]]
-failures = [e for e in episode_stats if not e[3]]
-
-print(f"Total Episodes: {EPISODES}")
-print(f"Successes: {len(successes)} | Failures: {len(failures)}")
-if successes:
-    avg_reward_success = sum(e[1] for e in successes) / len(successes)
-    print(f"Avg Reward (Successes): {avg_reward_success:.2f}")
-if failures:
-    avg_reward_fail = sum(e[1] for e in failures) / len(failures)
-    print(f"Avg Reward (Failures): {avg_reward_fail:.2f}")
+def train(env, agent, episodes=EPISODES):
+    episode_stats = []  # To store all results
+    for episode in range(episodes):
+        state = env.reset()
+        done = False
+        total_reward = 0
+        steps = 0
+        while not done:
+            action = agent.choose_action(state)
+            next_state, reward, done = env.step(action)
+            agent.learn(state, action, reward, next_state)
+            state = next_state
+            total_reward += reward
+            steps += 1
+
+        # Check if agent reached the destination
+        reached_goal = state == env.size * env.size - 1
+        episode_stats.append((episode + 1, total_reward, steps, reached_goal))
+
+        # Print key stats every 500 episodes
+        if (episode + 1) % 500 == 0:
+            print(f"Episode {episode + 1:4d} | Reward: {total_reward:5.1f} | Steps: {steps:3d} | {'Success' if reached_goal else 'Failed'}")
+
+    # ---------- Final Summary ----------
+    print("\n=== FINAL EPISODE STATS SUMMARY ===")
+    successes = [e for e in episode_stats if e[3]]
+    failures = [e for e in episode_stats if not e[3]]
+
+    print(f"Total Episodes: {episodes}")
+    print(f"Successes: {len(successes)} | Failures: {len(failures)}")
+    if successes:
+        avg_reward_success = sum(e[1] for e in successes) / len(successes)
+        print(f"Avg Reward (Successes): {avg_reward_success:.2f}")
+    if failures:
+        avg_reward_fail = sum(e[1] for e in failures) / len(failures)
+        print(f"Avg Reward (Failures): {avg_reward_fail:.2f}")
+    return episode_stats
+
+def load_or_train(env, agent, episodes=EPISODES, plan=False, cache_dir=CACHE_DIR, retrain=False):
+    # Load the Q-table trained for this grid and these settings, training (or, with plan,
+    # solving the grid by value iteration) and caching it only on a miss
+    filename = cache_file(env, agent, episodes, plan, cache_dir)
+    if os.path.exists(filename) and not retrain:
+        agent.load(filename)
+        print(f"Loaded cached Q-table {filename}")
+        return agent
+
+    if plan:
+        agent.set_q_table(value_iteration(env, gamma=agent.gamma))
+        print("Q-table solved with value iteration")
+    else:
+        train(env, agent, episodes)
+    if not reaches_goal(agent.q_table, env):
+        print("Warning: the greedy policy never reaches D; it loops between land tiles, "
+              "which the current rewards value above the goal")
+    os.makedirs(cache_dir, exist_ok=True)
+    # Save under a unique temp name and rename it into place, so runs training the same
+    # layout at once never write into each other's file
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".pkl", delete=False) as f:
+        pass
+    agent.save(f.name)
+    os.replace(f.name, filename)
+    return agent
 
 # ---------- GUI ----------
+TILE_COLORS = np.array(['red', 'green', 'blue', 'gold'], dtype=object)  # indexed by tile code
+VISITED_LAND = '#228B22'  # darker green for visited land
+
 class LavaGameGUI:
     def __init__(self, master, env, agent):
         self.master = master
@@ -54,35 +98,23 @@ class LavaGameGUI:
         self.agent = agent
         self.canvas = tk.Canvas(master, width=env.size * CELL_SIZE, height=env.size * CELL_SIZE)
         self.canvas.pack()
+        # grid_canvas.py at the repo root is shared with the Q Learning vs SARSA GUI
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from grid_canvas import GridCanvas
+        self.grid_canvas = GridCanvas(self.canvas, self.tile_colors(), CELL_SIZE)
         self.draw_grid()
         self.run_game()
 
+    def tile_colors(self):
+        grid, _, visited = self.env.get_grid()
+        colors = TILE_COLORS[grid]
+        colors[visited & (grid == LAND)] = VISITED_LAND
+        return colors
+
     def draw_grid(self):
-        self.canvas.delete("all")
-        grid, agent_pos, visited = self.env.get_grid()
-
-        for i in range(self.env.size):
-            for j in range(self.env.size):
-                x1, y1 = j * CELL_SIZE, i * CELL_SIZE
-                x2, y2 = x1 + CELL_SIZE, y1 + CELL_SIZE
-                tile = grid[i][j]
-                color = {
-                    'L': 'red',
-                    'G': 'green',
-                    'S': 'blue',
-                    'D': 'gold'
-                }.get(tile, 'gray')
-
-                if (i, j) in visited and tile == 'G':
-                    color = '#228B22'  # darker green for visited land
-
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline='black')
-
-        # Draw agent
-        x, y = agent_pos
-        x1, y1 = y * CELL_SIZE + 10, x * CELL_SIZE + 10
-        x2, y2 = x1 + CELL_SIZE - 20, y1 + CELL_SIZE - 20
-        self.canvas.create_oval(x1, y1, x2, y2, fill='white')
+        # Only tiles whose color changed are redrawn and the agent oval is moved, not recreated
+        self.grid_canvas.set_colors(self.tile_colors())
+        self.grid_canvas.move_agent('agent', self.env.agent_pos)
 
     def run_game(self):
         state = self.env.reset()
@@ -92,7 +124,12 @@ class LavaGameGUI:
     def step(self, state):
         action = self.agent.choose_action(state)
         next_state, reward, done = self.env.step(action)
-        self.update_gui()
+        # A step can only change the color of the tile the agent landed on
+        row, col = self.env.agent_pos
+        if self.env.grid[row, col] == LAND:
+            self.grid_canvas.set_cell(row, col, VISITED_LAND)
+        self.grid_canvas.move_agent('agent', (row, col))
+        self.master.update_idletasks()
         if not done:
             self.master.after(500, self.step, next_state)
 
@@ -101,8 +138,27 @@ class LavaGameGUI:
         self.master.update_idletasks()
         self.master.update()
 
-if __name__ == '__main__':
+def play(env, agent):
     root = tk.Tk()
     root.title("Floor is Lava RL Agent")
     gui = LavaGameGUI(root, env, agent)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Floor is Lava Q-learning agent")
+    parser.add_argument("command", nargs="?", choices=("train", "play"), default="play",
+                        help="train: train (or load) and cache the Q-table; play: also open the GUI")
+    parser.add_argument("--episodes", type=int, default=EPISODES)
+    parser.add_argument("--plan", action="store_true", help="solve the grid with value iteration instead of training")
+    parser.add_argument("--retrain", action="store_true", help="ignore a cached Q-table")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    env = FloorIsLavaEnv()
+    agent = QLearningAgent(state_size=(env.size, env.size), action_size=len(env.actions))
+    load_or_train(env, agent, args.episodes, args.plan, args.cache_dir, args.retrain)
+    if args.command == "play":
+        play(env, agent)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import heapq
+import numpy as np
+from Agent import QLearningAgent
+
+def build_model(env):
+    # (next_state, reward, done) tables of env's current grid, each (cells, actions). The
+    # first-visit bonus depends on the path taken so far, so the model leaves it out: its
+    # values undercount a real episode by at most 1 per newly visited tile
+    return env.next_state, env.base_reward.astype(float), env.terminal
+
+def value_iteration(env, gamma=0.9, tol=1e-6, max_iterations=10000):
+    # Q-table of the optimal policy for env's grid, in the layout QLearningAgent uses
+    next_state, rewards, done = build_model(env)
+    continues = np.where(done, 0.0, gamma)
+    q_table = np.zeros(rewards.shape)
+    for _ in range(max_iterations):
+        new_q = rewards + continues * q_table.max(axis=1)[next_state]
+        delta = np.abs(new_q - q_table).max()
+        q_table = new_q
+        if delta < tol:
+            break
+    return q_table
+
+def policy_value(q_table, env, gamma=0.9, tol=1e-6, max_iterations=10000):
+    # Value of every cell when following q_table's greedy actions on env's grid
+    next_state, rewards, done = build_model(env)
+    cells = np.arange(len(q_table))
+    actions = q_table.argmax(axis=1)
+    next_state, rewards = next_state[cells, actions], rewards[cells, actions]
+    continues = np.where(done[cells, actions], 0.0, gamma)
+    values = np.zeros(len(q_table))
+    for _ in range(max_iterations):
+        new_values = rewards + continues * values[next_state]
+        delta = np.abs(new_values - values).max()
+        values = new_values
+        if delta < tol:
+            break
+    return values
+
+def reaches_goal(q_table, env):
+    # Whether q_table's greedy policy walks from S to D on the model. The model has no
+    # first-visit bonus, so the greedy walk is deterministic and a revisited cell means a
+    # loop. Under the current rewards, jumping between land tiles (+8 each time) is worth
+    # more than D at gamma = 0.9 (V = 80), so an optimal policy can loop forever.
+    next_state, _, done = build_model(env)
+    actions = q_table.argmax(axis=1)
+    state, seen = 0, set()
+    while state not in seen:
+        seen.add(state)
+        if done[state, actions[state]]:
+            return True
+        state = next_state[state, actions[state]]
+    return False
+
+class PrioritizedSweepingAgent(QLearningAgent):
+    # Q-learning plus planning on the env's known model. After each real step, up to
+    # planning_steps full backups are spent on the (state, action) pairs whose values are
+    # furthest out of date, working backwards through their predecessors. When the grid
+    # changes, call sync_model() to queue only the pairs whose model changed.
+    def __init__(self, env, alpha=0.1, gamma=0.9, epsilon=0.2, planning_steps=10, theta=1e-4):
+        super().__init__((env.size, env.size), len(env.actions), alpha, gamma, epsilon)
+        self.planning_steps = planning_steps
+        self.theta = theta
+        self.model_next = None
+        self.queue = []  # heap of (-priority, state, action)
+        self.priority = {}  # (state, action) -> priority of its live queue entry
+        self.backups = 0
+        self.sync_model(env)
+
+    def sync_model(self, env):
+        next_state, rewards, done = build_model(env)
+        if self.model_next is None:
+            changed = np.ones(rewards.shape, dtype=bool)
+        else:
+            changed = (next_state != self.model_next) | (rewards != self.model_reward) | (done != self.model_done)
+        self.model_next, self.model_reward, self.model_done = next_state, rewards, done
+        self._next = next_state.tolist()
+        self._reward = rewards.tolist()
+        self._done = done.tolist()
+        self.predecessors = [[] for _ in range(len(rewards))]
+        for state, action in zip(*np.nonzero(~done)):
+            self.predecessors[next_state[state, action]].append((int(state), int(action)))
+        for state, action in zip(*np.nonzero(changed)):
+            self._queue(int(state), int(action))
+
+    def _target(self, state, action):
+        if self._done[state][action]:
+            return self._reward[state][action]
+        return self._reward[state][action] + self.gamma * self._max[self._next[state][action]]
+
+    def _queue(self, state, action):
+        priority = abs(self._target(state, action) - self._q[state * self.action_size + action])
+        if priority > self.theta and priority > self.priority.get((state, action), 0):
+            self.priority[state, action] = priority
+            heapq.heappush(self.queue, (-priority, state, action))
+
+    def learn(self, state, action, reward, next_state):
+        super().learn(state, action, reward, next_state)
+        self._queue(state, action)
+        for pair in self.predecessors[state]:
+            self._queue(*pair)
+        self.plan(self.planning_steps)
+
+    def plan(self, steps=None):
+        # Run up to steps backups (all queued work if None); returns how many were run
+        done = 0
+        while self.queue and (steps is None or done < steps):
+            priority, state, action = heapq.heappop(self.queue)
+            if self.priority.get((state, action)) != -priority:
+                continue  # superseded by a higher-priority entry
+            del self.priority[state, action]
+            new_q = self._target(state, action)
+            self._q[state * self.action_size + action] = new_q
+            self._update_best(state, action, new_q)
+            for pair in self.predecessors[state]:
+                self._queue(*pair)
+            done += 1
+        self.backups += done
+        return done
@@ -1,42 +1,78 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import random
-
-random.seed(42)  # Optional: makes maze reproducible
-
-# Maze dimensions (odd numbers for walls + paths)
-width, height = 8, 8
-if width % 2 == 0:
-    width += 1
-if height % 2 == 0:
-    height += 1
-
-maze = np.ones((height, width), dtype=np.int8)
-
-def carve_passages(x, y, depth=0, max_depth=10):
-    # Bias: prefer right and down directions
-    directions = [(2, 0), (0, 2), (-2, 0), (0, -2)]
-    random.shuffle(directions)
-    for dx, dy in directions:
-        nx, ny = x + dx, y + dy
-        if 1 <= nx < width - 1 and 1 <= ny < height - 1:
-            if maze[ny][nx] == 1:
-                maze[ny][nx] = 0
-                maze[y + dy // 2][x + dx // 2] = 0
-                if depth < max_depth:
-                    carve_passages(nx, ny, depth + 1, max_depth)
-
-# Start maze generation
-maze[1][1] = 0
-carve_passages(1, 1, max_depth=6)  # Lower max_depth = simpler maze
-
-# Add entrance and exit
-maze[0][1] = 0                    # Entrance
-maze[height - 1][width - 2] = 0   # Exit
-
-# Display
-plt.figure(figsize=(4, 4))
-plt.imshow(maze, cmap='binary')
-plt.axis('off')
-plt.title('Simple 8x8 Maze')
-plt.show()
+import os
+import tempfile
+from itertools import permutations
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maze_cache")
+
+def maze_size(width, height):
+    # Mazes need odd dimensions (walls + paths), and at least one cell inside the walls
+    if width < 2 or height < 2:
+        raise ValueError(f"Maze must be at least 2x2 (3x3 with walls), got {width}x{height}")
+    return width + (width % 2 == 0), height + (height % 2 == 0)
+
+def generate_maze(width=8, height=8, seed=42):
+    # Perfect maze (one path between any two cells) by depth-first carving from (1, 1),
+    # with an explicit stack so the size is not limited by the recursion depth. 1 = wall
+    width, height = maze_size(width, height)
+    rng = np.random.default_rng(seed)
+
+    # Flat board padded with two wall rows above and below, so stepping two cells off any
+    # edge lands on padding or an even column. 2 marks cells still to be carved
+    board = np.ones((height + 4, width), dtype=np.uint8)
+    board[3:-3:2, 1:-1:2] = 2
+    board = bytearray(board.tobytes())
+
+    # Each cell tries its 4 directions in one of the 24 orders, drawn up front
+    orders = list(permutations((2, 2 * width, -2, -2 * width)))
+    choice = rng.integers(0, len(orders), len(board), dtype=np.uint8).tobytes()
+
+    start = 3 * width + 1
+    board[start] = 0
+    cells = [start]
+    directions = [iter(orders[choice[start]])]  # directions each cell on the stack has left
+    while cells:
+        cell = cells[-1]
+        for step in directions[-1]:
+            if board[cell + step] == 2:
+                cell += step
+                board[cell] = 0
+                board[cell - (step >> 1)] = 0
+                cells.append(cell)
+                directions.append(iter(orders[choice[cell]]))
+                break
+        else:
+            cells.pop()
+            directions.pop()
+
+    maze = np.frombuffer(board, dtype=np.uint8).reshape(height + 4, width)[2:-2] != 0
+    maze = maze.astype(np.int8)
+    maze[0][1] = 0                    # Entrance
+    maze[height - 1][width - 2] = 0   # Exit
+    return maze
+
+def load_maze(width=8, height=8, seed=42, cache_dir=CACHE_DIR):
+    # generate_maze, cached on disk as .npy per (width, height, seed)
+    width, height = maze_size(width, height)
+    filename = os.path.join(cache_dir, f"maze_{width}x{height}_seed{seed}.npy")
+    if os.path.exists(filename):
+        return np.load(filename)
+    maze = generate_maze(width, height, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a unique temp file and rename it into place, so concurrent callers never
+    # read a half-written maze or write over each other's temp file
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".npy", delete=False) as f:
+        np.save(f, maze)
+    os.replace(f.name, filename)
+    return maze
+
+def show_maze(maze, title=None):
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(4, 4))
+    plt.imshow(maze, cmap='binary')
+    plt.axis('off')
+    plt.title(title or f'{maze.shape[1]}x{maze.shape[0]} Maze')
+    plt.show()
+
+if __name__ == "__main__":
+    show_maze(load_maze(8, 8, seed=42), 'Simple 8x8 Maze')
@@ -3,13 +3,14 @@ import matplotlib.pyplot as plt
 from IPython.display import clear_output
 import time
 import random
-from Maze import maze, width, height
+from Maze import load_maze
 
 class MazeEnv:
-    def __init__(self):
+    def __init__(self, maze):
         self.maze = maze.copy()
+        self.height, self.width = self.maze.shape
         self.start = (0, 1)
-        self.end = (height - 1, width - 2)
+        self.end = (self.height - 1, self.width - 2)
         self.current_pos = self.start
         self.actions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # right, down, left, up
         self.steps = 0
@@ -26,7 +27,7 @@ class MazeEnv:
                    self.current_pos[1] + self.actions[action][1])
         
         # Check if move is valid
-        if (0 <= next_pos[0] < height and 0 <= next_pos[1] < width and 
+        if (0 <= next_pos[0] < self.height and 0 <= next_pos[1] < self.width and
             self.maze[next_pos[0]][next_pos[1]] == 0):
             self.current_pos = next_pos
             reward = 10 if next_pos == self.end else -0.1  # Increased reward for reaching goal
@@ -41,7 +42,7 @@ class MazeEnv:
         valid = []
         for i, (dx, dy) in enumerate(self.actions):
             nx, ny = state[0] + dx, state[1] + dy
-            if 0 <= nx < height and 0 <= ny < width and self.maze[nx][ny] == 0:
+            if 0 <= nx < self.height and 0 <= ny < self.width and self.maze[nx][ny] == 0:
                 valid.append(i)
         return valid
     
@@ -101,9 +102,11 @@ class QLearningAgent:
         if len(valid) <= 1 and state != env.end:
             self.dead_ends.add(state)
 
-def train_agent(max_episodes=2000):
-    env = MazeEnv()
-    agent = QLearningAgent(state_size=(height, width), action_size=4)
+def train_agent(max_episodes=2000, maze=None):
+    if maze is None:
+        maze = load_maze()
+    env = MazeEnv(maze)
+    agent = QLearningAgent(state_size=maze.shape, action_size=4)
     best_rewards = []
     best_episodes = []
     episode_paths = []
@@ -159,8 +162,8 @@ def train_agent(max_episodes=2000):
     
     return agent, best_episodes, episode_paths
 
-def visualize_best_episodes(agent, best_episodes, episode_paths):
-    env = MazeEnv()
+def visualize_best_episodes(agent, best_episodes, episode_paths, maze):
+    env = MazeEnv(maze)
     for i, episode in enumerate(best_episodes):
         path = episode_paths[i]
         plt.figure(figsize=(6, 6))  # Smaller figure size for 8x8 maze
@@ -176,7 +179,8 @@ def visualize_best_episodes(agent, best_episodes, episode_paths):
         time.sleep(1)
 
 if __name__ == "__main__":
-    agent, best_episodes, episode_paths = train_agent()
+    maze = load_maze(8, 8, seed=42)
+    agent, best_episodes, episode_paths = train_agent(maze=maze)
     print("\nTop 3 episodes:", best_episodes)
     print("\nVisualizing best episodes...")
-    visualize_best_episodes(agent, best_episodes, episode_paths) 
\ No newline at end of file
+    visualize_best_episodes(agent, best_episodes, episode_paths, maze)
\ No newline at end of file
@@ -1,61 +1,129 @@
 import random
+import numpy as np
+from Environment import ACTIONS, LAND, WATER, GOAL
 
 class Agent:
-    def __init__(self, env, start, end, land_tag, track_range, use_sarsa=False, learning_rate=0.1, discount=0.95, epsilon=0.1):
+    def __init__(self, env, start, end, land_tag, track_range, use_sarsa=False, learning_rate=0.1, discount=0.95, epsilon=0.1,
+                 trace_decay=0.0, replacing_traces=False, trace_threshold=1e-3):
         self.env = env
         self.start = start
         self.end = end
         self.land_tag = land_tag
         self.track_range = track_range  # valid rows
         self.use_sarsa = use_sarsa
-        self.q_table = {}
         self.lr = learning_rate
         self.gamma = discount
         self.epsilon = epsilon
         self.prev_state = None
-        self.actions = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                        (-2, 0), (2, 0), (0, -2), (0, 2)]
+        self.episode_return = 0
+        # lambda > 0 learns with eligibility traces: SARSA(lambda), or Watkins Q(lambda) for
+        # the Q-learner. Traces below trace_threshold are dropped, so at most about
+        # log(threshold) / log(gamma * lambda) pairs are updated per step
+        self.trace_decay = trace_decay
+        self.replacing_traces = replacing_traces
+        self.trace_threshold = trace_threshold
+        # Actions are indices into this list of (row, col) moves
+        self.actions = ACTIONS
+        self.q_table = np.zeros((env.rows, env.cols, len(self.actions)))
+        self._q = self.q_table.reshape(-1)
+        # Live traces are the first trace_count entries of these arrays, which only grow
+        # (doubling) when full, so a step does not reallocate them
+        self.trace_pairs = np.zeros(16, dtype=np.intp)  # flat Q-table indices with a live trace
+        self.traces = np.zeros(16)
+        self.compile()
+        self.start_episode()
+
+    def start_episode(self):
+        self.prev_state = None
+        self.episode_return = 0
+        self.trace_count = 0
+
+    def compile(self):
+        # Per-cell lists of (next state, wall hit, landing cell class, jump) for step(); call
+        # again if the env's tracks are regenerated
+        next_cell, wall, cell_class, jump = self.env.compile_track(self.land_tag, self.track_range, self.end)
+        positions = [divmod(cell, self.env.cols) for cell in range(self.env.rows * self.env.cols)]
+        self._moves = [[list(zip([positions[cell] for cell in cells], walls, classes, jumps))
+                        for cells, walls, classes, jumps in zip(*row)]
+                       for row in zip(next_cell.tolist(), wall.tolist(), cell_class.tolist(), jump.tolist())]
+        self._land = {positions[cell] for cell in next_cell[cell_class == LAND].tolist()}
 
     def get_q(self, state, action):
-        return self.q_table.get((state, action), 0.0)
+        return self.q_table[state][action]
 
     def choose_action(self, state):
         if random.random() < self.epsilon:
-            return random.choice(self.actions)
-        qs = [(self.get_q(state, a), a) for a in self.actions]
-        return max(qs, key=lambda x: x[0])[1]
+            # Same draw as random.choice(self.actions)
+            return random.randrange(len(self.actions))
+        # argmax keeps the first of equal values, as max() over the actions did
+        return int(self.q_table[state].argmax())
 
     def step(self, state, action):
-        next_state = (state[0] + action[0], state[1] + action[1])
+        next_state, wall, cell_class, jump = self._moves[state[0]][state[1]][action]
 
         # Stay in track
-        if not self.env.is_valid(next_state) or not (self.track_range[0] <= next_state[0] <= self.track_range[1]):
+        if wall:
             return state, -10
 
-        cell = self.env.get_state_type(next_state)
         reward = -1  # step
 
-        if abs(action[0]) == 2 or abs(action[1]) == 2:
+        if jump:
             reward -= 2  # jump cost
 
         if next_state == self.prev_state:
             reward -= 1
-        elif cell.startswith(self.land_tag):
-            if self.prev_state and self.env.get_state_type(self.prev_state).startswith(self.land_tag):
+        elif cell_class == LAND:
+            if self.prev_state in self._land:
                 reward += 10
             reward += 1
-        elif cell == 'W':
+        elif cell_class == WATER:
             reward -= 10
-        elif next_state == self.end:
+        elif cell_class == GOAL:
             reward += 100
 
         self.prev_state = next_state
+        self.episode_return += reward
         return next_state, reward
 
     def learn(self, state, action, reward, next_state, next_action=None):
-        q = self.get_q(state, action)
-        if self.use_sarsa and next_action:
-            next_q = self.get_q(next_state, next_action)
+        q = float(self.q_table[state][action])
+        if self.use_sarsa and next_action is not None:
+            next_q = float(self.q_table[next_state][next_action])
+        else:
+            next_q = float(self.q_table[next_state].max())
+        if self.trace_decay:
+            self._learn_traces(state, action, reward + self.gamma * next_q - q, next_state, next_action)
         else:
-            next_q = max([self.get_q(next_state, a) for a in self.actions])
-        self.q_table[(state, action)] = q + self.lr * (reward + self.gamma * next_q - q)
\ No newline at end of file
+            self.q_table[state][action] = q + self.lr * (reward + self.gamma * next_q - q)
+
+    def _learn_traces(self, state, action, error, next_state, next_action):
+        # Watkins Q(lambda) cuts the traces after an exploratory action
+        cut = not self.use_sarsa and next_action is not None and \
+            self.q_table[next_state][next_action] < self.q_table[next_state].max()
+        pair = (state[0] * self.env.cols + state[1]) * len(self.actions) + action
+        count = self.trace_count
+        found = np.flatnonzero(self.trace_pairs[:count] == pair)
+        if len(found) == 0:
+            if count == len(self.traces):
+                self.trace_pairs = np.concatenate((self.trace_pairs, np.zeros_like(self.trace_pairs)))
+                self.traces = np.concatenate((self.traces, np.zeros_like(self.traces)))
+            self.trace_pairs[count] = pair
+            self.traces[count] = 1.0
+            count += 1
+        elif self.replacing_traces:
+            self.traces[found] = 1.0
+        else:
+            self.traces[found] += 1.0
+        pairs, traces = self.trace_pairs[:count], self.traces[:count]
+        self._q[pairs] += self.lr * error * traces
+
+        if cut:
+            self.trace_count = 0
+            return
+        traces *= self.gamma * self.trace_decay
+        live = traces >= self.trace_threshold
+        if not live.all():
+            # Keep the live traces at the front
+            count = np.count_nonzero(live)
+            pairs[:count], traces[:count] = pairs[live], traces[live]
+        self.trace_count = count
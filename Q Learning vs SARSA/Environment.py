@@ -1,5 +1,56 @@
-import tkinter as tk
 import random
+import numpy as np
+
+# (row, col) moves; an agent's action is an index into this list
+ACTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1),
+           (-2, 0), (2, 0), (0, -2), (0, 2)]
+
+# Cell classes as seen from one track
+OTHER, LAND, WATER, GOAL = 0, 1, 2, 3
+
+def track_classes(grids, land_tag, end):
+    # Class of every cell as seen from the track with this land tag and goal; grids are
+    # arrays of cell names and may have leading batch dimensions
+    classes = np.select([np.char.startswith(grids, land_tag), grids == 'W'], [LAND, WATER], OTHER).astype(np.int8)
+    classes[..., end[0], end[1]] = GOAL
+    return classes
+
+def track_tables(grids, land_tag, track_range, end):
+    # Integer tables for one track, indexed by (row, col, action): the flat index of the
+    # cell the move lands on, whether it leaves the grid or the track rows (the agent
+    # then stays put), the class of the landing cell and whether the move is a jump. Only
+    # the class table takes the leading batch dimensions of grids
+    n_rows, n_cols = grids.shape[-2:]
+    rows, cols = np.indices((n_rows, n_cols))
+    moves = np.array(ACTIONS)
+    new_r = rows[..., None] + moves[:, 0]
+    new_c = cols[..., None] + moves[:, 1]
+    wall = ~((new_r >= track_range[0]) & (new_r <= track_range[1]) & (new_c >= 0) & (new_c < n_cols))
+    new_r = np.where(wall, rows[..., None], new_r)
+    new_c = np.where(wall, cols[..., None], new_c)
+
+    classes = track_classes(grids, land_tag, end)
+    next_cell = (new_r * n_cols + new_c).astype(np.int32)
+    cell_class = classes.reshape(classes.shape[:-2] + (-1,))[..., next_cell]
+    jump = np.broadcast_to(np.abs(moves).max(axis=1) == 2, wall.shape)
+    return next_cell, wall.astype(np.int8), cell_class, jump.astype(np.int8)
+
+def generate_grids(count, cols=10, rng=None):
+    # Vectorized GridWorld.generate_tracks: count random 10 x cols grids of cell names
+    rng = np.random.default_rng(rng)
+    grids = np.full((count, 10, cols), 'W', dtype='<U2')
+    grids[:, 0, 0], grids[:, 4, cols - 1] = 'S1', 'E1'
+    grids[:, 5, 0], grids[:, 9, cols - 1] = 'S2', 'E2'
+
+    # Same 3 corridor rows on both tracks
+    corridor = rng.random((count, 5)).argsort(axis=1)[:, :3, None]
+    races = np.arange(count)[:, None, None]
+    grids[races, corridor, np.arange(1, cols - 1)] = 'L1'
+    grids[races, corridor + 5, np.arange(1, cols - 1)] = 'L2'
+
+    # Land next to the goals (already land if the corridor runs along the goal row)
+    grids[:, 4, cols - 2], grids[:, 9, cols - 2] = 'L1', 'L2'
+    return grids
 
 class GridWorld:
     def __init__(self, rows=10, cols=10):
@@ -58,14 +109,14 @@ class GridWorld:
             return 'W'
         return self.grid[pos[0]][pos[1]]
 
-    def draw(self, canvas):
-        block = 50
-        for i in range(self.rows):
-            for j in range(self.cols):
-                val = self.grid[i][j]
-                color = {
-                    'W': 'blue', 'L1': 'tan', 'L2': 'tan',
-                    'S1': 'green', 'S2': 'green',
-                    'E1': 'red', 'E2': 'red'
-                }.get(val, 'white')
-                canvas.create_rectangle(j * block, i * block, (j + 1) * block, (i + 1) * block, fill=color, outline='black')
+    def compile_track(self, land_tag, track_range, end):
+        return track_tables(np.array(self.grid), land_tag, track_range, end)
+
+    def colors(self):
+        # Fill color of every cell, for drawing with GridCanvas
+        palette = {
+            'W': 'blue', 'L1': 'tan', 'L2': 'tan',
+            'S1': 'green', 'S2': 'green',
+            'E1': 'red', 'E2': 'red'
+        }
+        return [[palette.get(val, 'white') for val in row] for row in self.grid]
@@ -0,0 +1,122 @@
+import numpy as np
+from Environment import ACTIONS, LAND, WATER, GOAL, generate_grids, track_tables
+
+class BatchedRace:
+    # Runs `races` independent Q-learning vs SARSA races in lockstep. Each race has its own
+    # grid and its own pair of learners, and plays the same episodes as main.run_agents. All
+    # 2 * races learners live in flat arrays: learner 2k is race k's Q-learner on track 1
+    # and learner 2k + 1 its SARSA learner on track 2. A learner's state is its row in the
+    # stacked Q-table, learner * cells + cell, so every lookup is a single gather.
+    def __init__(self, races, cols=10, seed=None, learning_rate=0.1, discount=0.95, epsilon=0.1, max_steps=300):
+        self.races = races
+        self.cols = cols
+        self.lr = learning_rate
+        self.gamma = discount
+        self.epsilon = epsilon
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.grids = generate_grids(races, cols, self.rng)
+        self.compile()
+        self.q_table = np.zeros((2 * races * self.cells, len(ACTIONS)))
+
+    def compile(self):
+        races, cols, actions = self.races, self.cols, len(ACTIONS)
+        self.cells = cells = 10 * cols
+        tracks = [('L1', (0, 4), (0, 0), (4, cols - 1)), ('L2', (5, 9), (5, 0), (9, cols - 1))]
+        next_cell, wall, cell_class, jump = [], [], [], []
+        for tag, rows, _, end in tracks:
+            t_next, t_wall, t_class, t_jump = track_tables(self.grids, tag, rows, end)
+            next_cell.append(np.broadcast_to(t_next.reshape(cells, actions), (races, cells, actions)))
+            wall.append(np.broadcast_to(t_wall.reshape(cells, actions), (races, cells, actions)))
+            cell_class.append(t_class.reshape(races, cells, actions))
+            jump.append(np.broadcast_to(t_jump.reshape(cells, actions), (races, cells, actions)))
+        # Flat (learner, cell, action) tables, laid out like the Q-table
+        next_cell, wall, cell_class, jump = (np.stack(t, axis=1).reshape(-1) for t in (next_cell, wall, cell_class, jump))
+        learner = np.arange(2 * races).repeat(cells * actions)
+        self.next_row = learner * cells + next_cell
+
+        # Reward of each move when the previous cell is neither the landing cell nor own land;
+        # step() adjusts it for those two cases
+        self.reward = np.where(wall, -10, np.select(
+            [cell_class == LAND, cell_class == WATER, cell_class == GOAL], [1, -10, 100], 0) - 1 - 2 * jump)
+        self.revisit_reward = np.where(wall, -10, -2 - 2 * jump)
+        self.lands = (cell_class == LAND) & (wall == 0)
+
+        starts = [start[0] * cols + start[1] for _, _, start, _ in tracks]
+        ends = [end[0] * cols + end[1] for _, _, _, end in tracks]
+        self.start = np.arange(2 * races) * cells + np.tile(starts, races)
+        self.end = np.arange(2 * races) * cells + np.tile(ends, races)
+        self.sarsa = np.tile([False, True], races)
+        self._learners = np.arange(2 * races)
+
+    def choose_actions(self, q_rows):
+        # Epsilon-greedy from each learner's Q-row; argmax keeps the first of equal values
+        # like Agent.choose_action
+        explore = self.rng.random(len(q_rows)) < self.epsilon
+        return np.where(explore, self.rng.integers(0, len(ACTIONS), len(q_rows)), q_rows.argmax(axis=1))
+
+    def step(self, states, actions, prev_states, prev_land):
+        # Agent.step for every learner. prev_states is -1 where there is none yet and
+        # prev_land whether the previous cell is own land. A wall hit leaves the state and
+        # the previous cell as they were.
+        moves = states * len(ACTIONS) + actions
+        next_states = self.next_row[moves]
+        lands = self.lands[moves]
+        rewards = np.where(next_states == prev_states, self.revisit_reward[moves],
+                           self.reward[moves] + 10 * (prev_land & lands))
+        moved = next_states != states
+        return next_states, rewards, np.where(moved, next_states, prev_states), np.where(moved, lands, prev_land)
+
+    def run(self, episodes):
+        # Train every race for `episodes` races. Returns (races, episodes) arrays of winner
+        # codes (0 none, 1 Q-learning, 2 SARSA, as main.WINNERS), step counts and both
+        # learners' returns
+        winners = np.zeros((self.races, episodes), dtype=np.int8)
+        steps = np.zeros((self.races, episodes), dtype=np.int16)
+        returns = np.zeros((self.races, episodes, 2), dtype=np.float32)
+        race_returns = np.zeros(2 * self.races)
+        episode = np.zeros(self.races, dtype=np.int64)
+        race_steps = np.zeros(self.races, dtype=np.int64)
+        states = self.start.copy()
+        prev_states = np.full(2 * self.races, -1)
+        prev_land = np.zeros(2 * self.races, dtype=bool)
+        actions = self.choose_actions(self.q_table[states])
+        learners, q_flat = self._learners, self.q_table.reshape(-1)
+        live = np.ones(2 * self.races, dtype=bool)
+
+        while live.any():
+            next_states, rewards, prev_states, prev_land = self.step(states, actions, prev_states, prev_land)
+            next_rows = self.q_table[next_states]
+            next_actions = self.choose_actions(next_rows)
+
+            # Q-learning backs up the best next value, SARSA the next action's
+            next_q = np.where(self.sarsa, next_rows[learners, next_actions], next_rows.max(axis=1))
+            moves = states * len(ACTIONS) + actions
+            q = q_flat[moves]
+            q_flat[moves] = np.where(live, q + self.lr * (rewards + self.gamma * next_q - q), q)
+            states, actions = next_states, next_actions
+            race_returns += rewards
+
+            # Track 1 is checked first, as in run_agents
+            reached = (states == self.end).reshape(-1, 2)
+            race_steps += 1
+            finished = (reached.any(axis=1) | (race_steps == self.max_steps)) & (episode < episodes)
+            if not finished.any():
+                continue
+            done = np.flatnonzero(finished)
+            winners[done, episode[done]] = np.where(reached[done, 0], 1, np.where(reached[done, 1], 2, 0))
+            steps[done, episode[done]] = race_steps[done] - reached[done].any(axis=1)  # the winning move is not counted
+            returns[done, episode[done]] = race_returns.reshape(-1, 2)[done]
+            episode[done] += 1
+            race_steps[done] = 0
+
+            # Both learners of a finished race start over; races that have played all their
+            # episodes stop learning
+            reset = np.repeat(finished, 2)
+            states = np.where(reset, self.start, states)
+            prev_states = np.where(reset, -1, prev_states)
+            prev_land &= ~reset
+            race_returns[reset] = 0
+            actions = np.where(reset, self.choose_actions(self.q_table[states]), actions)
+            live = np.repeat(episode < episodes, 2)
+        return winners, steps, returns
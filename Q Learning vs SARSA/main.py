@@ -1,18 +1,23 @@
-import tkinter as tk
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
 import time
+import numpy as np
 from Environment import GridWorld
 from Agent import Agent
+from Race import BatchedRace
 
-def draw_agent(canvas, pos, color):
-    block = 50
-    x, y = pos
-    canvas.create_oval(y * block + 10, x * block + 10, y * block + 40, x * block + 40, fill=color)
+BLOCK = 50
+WINNERS = ["None", "Q-learning", "SARSA"]  # winner codes in the headless results
 
-def run_agents(env, canvas, agent1, agent2, render=False):
+def run_agents(env, view, agent1, agent2, render=False, delay=0.01):
     state1 = agent1.start
     state2 = agent2.start
-    agent1.prev_state = None
-    agent2.prev_state = None
+    agent1.start_episode()
+    agent2.start_episode()
 
     action1 = agent1.choose_action(state1)
     action2 = agent2.choose_action(state2)
@@ -20,22 +25,21 @@ def run_agents(env, canvas, agent1, agent2, render=False):
     steps = 0
     while steps < 300:
         if render:
-            canvas.delete("all")
-            env.draw(canvas)
-            draw_agent(canvas, state1, 'purple')   # Q-learning
-            draw_agent(canvas, state2, 'orange')   # SARSA
-            canvas.update()
-            time.sleep(0.01)
+            # The grid is drawn once; each frame only moves the two agents
+            view.move_agent('q_learning', state1, 'purple')
+            view.move_agent('sarsa', state2, 'orange')
+            view.canvas.update()
+            time.sleep(delay)
 
         # Q-learning step
         next_state1, reward1 = agent1.step(state1, action1)
         next_action1 = agent1.choose_action(next_state1)
-        agent1.learn(state1, action1, reward1, next_state1, next_action1 if agent1.use_sarsa else None)
+        agent1.learn(state1, action1, reward1, next_state1, next_action1)
 
         # SARSA step
         next_state2, reward2 = agent2.step(state2, action2)
         next_action2 = agent2.choose_action(next_state2)
-        agent2.learn(state2, action2, reward2, next_state2, next_action2 if agent2.use_sarsa else None)
+        agent2.learn(state2, action2, reward2, next_state2, next_action2)
 
         state1, action1 = next_state1, next_action1
         state2, action2 = next_state2, next_action2
@@ -49,21 +53,113 @@ def run_agents(env, canvas, agent1, agent2, render=False):
 
     return "None", steps
 
-def main():
+def new_race(env, **options):
+    # options go to both agents, e.g. trace_decay for the lambda learners
+    agent1 = Agent(env, env.track1_start, env.track1_end, 'L1', track_range=(0, 4), use_sarsa=False, **options)
+    agent2 = Agent(env, env.track2_start, env.track2_end, 'L2', track_range=(5, 9), use_sarsa=True, **options)
+    return agent1, agent2
+
+def race_seed(seed, episodes=5000, options=None):
+    # One headless experiment: a fresh GridWorld and agent pair trained for episodes races.
+    # Returns per-episode winner codes (see WINNERS), step counts and both agents' returns
+    random.seed(seed)
+    env = GridWorld()
+    agent1, agent2 = new_race(env, **(options or {}))
+    winners = np.zeros(episodes, dtype=np.int8)
+    steps = np.zeros(episodes, dtype=np.int16)
+    returns = np.zeros((episodes, 2), dtype=np.float32)
+    for episode in range(episodes):
+        winner, steps[episode] = run_agents(env, None, agent1, agent2)
+        winners[episode] = WINNERS.index(winner)
+        returns[episode] = agent1.episode_return, agent2.episode_return
+    return winners, steps, returns
+
+def run_seeds(seeds, episodes=5000, workers=None, options=None):
+    # Run race_seed for every seed over a process pool; returns (seeds, episodes) arrays
+    winners = np.zeros((len(seeds), episodes), dtype=np.int8)
+    steps = np.zeros((len(seeds), episodes), dtype=np.int16)
+    returns = np.zeros((len(seeds), episodes, 2), dtype=np.float32)
+    with multiprocessing.Pool(workers) as pool:
+        jobs = [pool.apply_async(race_seed, (seed, episodes, options)) for seed in seeds]
+        for i, job in enumerate(jobs):
+            winners[i], steps[i], returns[i] = job.get()
+    return winners, steps, returns
+
+def mean_ci(samples):
+    # Mean and half-width of a normal 95% confidence interval, one sample per seed
+    half = 1.96 * samples.std(ddof=1) / math.sqrt(len(samples)) if len(samples) > 1 else float('nan')
+    return samples.mean(), half
+
+def summarize(winners, last=500):
+    # Mean win rate of each outcome across seeds with a normal 95% confidence interval,
+    # over all episodes and over the last episodes (the trained behaviour)
+    lines = []
+    for label, part in (("all episodes", winners), (f"last {last}", winners[:, -last:])):
+        lines.append(f"{label}:")
+        for code, name in enumerate(WINNERS):
+            rate, half = mean_ci((part == code).mean(axis=1))
+            lines.append(f"  {name:<11} {rate:6.1%} ± {half:.1%}")
+    return "\n".join(lines)
+
+def episodes_to_converge(returns, window=10, tolerance=0.02):
+    # Per seed: the first episode whose trailing window-episode mean return is within
+    # tolerance of the final window's mean (relative to that mean's magnitude). Returns
+    # level off within a few dozen episodes, so a long window or a loose tolerance just
+    # reports the window length for every seed
+    cumulative = np.cumsum(returns, axis=1, dtype=np.float64)
+    trailing = (cumulative[:, window - 1:] - np.pad(cumulative, ((0, 0), (1, 0)))[:, :-window]) / window
+    final = trailing[:, -1:]
+    close = np.abs(trailing - final) <= tolerance * np.abs(final)
+    return np.argmax(close, axis=1) + window
+
+def summarize_returns(returns, last=20, window=10, tolerance=0.02):
+    # Mean return over the last episodes, and episodes_to_converge; no seed can converge
+    # before `window` episodes, so that is printed alongside
+    window = min(window, returns.shape[1])
+    lines = [f"returns (converged: {window}-episode mean within {tolerance:.0%} of the final one):"]
+    for agent, name in ((0, "Q-learning"), (1, "SARSA")):
+        final, final_half = mean_ci(returns[:, -last:, agent].mean(axis=1))
+        episodes, episodes_half = mean_ci(episodes_to_converge(returns[..., agent], window, tolerance))
+        lines.append(f"  {name:<11} final {final:7.1f} ± {final_half:.1f}, "
+                     f"converged after {episodes:6.0f} ± {episodes_half:.0f} episodes")
+    return "\n".join(lines)
+
+def headless(args):
+    seeds = list(range(args.seed, args.seed + args.seeds))
+    start = time.perf_counter()
+    if args.batched:
+        winners, steps, returns = BatchedRace(len(seeds), seed=args.seed).run(args.episodes)
+    else:
+        options = {'trace_decay': args.trace_decay, 'replacing_traces': args.replacing_traces}
+        winners, steps, returns = run_seeds(seeds, args.episodes, args.workers, options)
+    print(f"{len(seeds)} seeds x {args.episodes} episodes in {time.perf_counter() - start:.1f}s")
+    print(summarize(winners, min(args.last, args.episodes)))
+    print(summarize_returns(returns, min(20, args.episodes)))
+    if args.out:
+        np.savez_compressed(args.out, seeds=np.array(seeds), winners=winners, steps=steps, returns=returns)
+        print(f"Saved per-episode results to {args.out}")
+
+def gui():
+    # Tk is only needed here, so headless runs work without it
+    import tkinter as tk
+    # grid_canvas.py at the repo root is shared with the Floor is Lava GUI
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from grid_canvas import GridCanvas
+
     root = tk.Tk()
     root.title("RL Racing: Q-Learning vs SARSA")
-    canvas = tk.Canvas(root, width=500, height=500)
-    canvas.pack()
-
     env = GridWorld()  # ✅ Only generate once and reuse
 
-    agent1 = Agent(env, env.track1_start, env.track1_end, 'L1', track_range=(0, 4), use_sarsa=False)
-    agent2 = Agent(env, env.track2_start, env.track2_end, 'L2', track_range=(5, 9), use_sarsa=True)
+    canvas = tk.Canvas(root, width=env.cols * BLOCK, height=env.rows * BLOCK)
+    canvas.pack()
+    view = GridCanvas(canvas, env.colors(), BLOCK)
+
+    agent1, agent2 = new_race(env)
 
     q_wins = sarsa_wins = no_wins = 0
 
     for episode in range(1, 5001):
-        winner, steps = run_agents(env, canvas, agent1, agent2, render=(episode % 500 == 0))  # show every 500th episode
+        winner, steps = run_agents(env, view, agent1, agent2, render=(episode % 500 == 0))  # show every 500th episode
         if winner == "Q-learning":
             q_wins += 1
         elif winner == "SARSA":
@@ -81,5 +177,26 @@ def main():
 
     root.mainloop()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Q-learning vs SARSA race")
+    parser.add_argument("--seeds", type=int, help="run this many seeds headless instead of the GUI")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--episodes", type=int, default=5000)
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--batched", action="store_true",
+                        help="race all seeds in lockstep in one process (NumPy RNG, so different draws)")
+    parser.add_argument("--trace-decay", type=float, default=0.0,
+                        help="lambda for SARSA(lambda) / Watkins Q(lambda); 0 keeps one-step backups")
+    parser.add_argument("--replacing-traces", action="store_true", help="replacing instead of accumulating traces")
+    parser.add_argument("--last", type=int, default=500, help="also report win rates over the last N episodes")
+    parser.add_argument("--out", help="save per-episode winners and steps to this .npz")
+    args = parser.parse_args(argv)
+    if args.batched and args.trace_decay:
+        parser.error("--batched races only run the one-step learners")
+    if args.seeds:
+        headless(args)
+    else:
+        gui()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,44 @@
+import numpy as np
+
+class GridCanvas:
+    # Retained-mode grid drawing for a tkinter Canvas. The cell rectangles are created once;
+    # after that set_colors() only recolors the cells whose color changed and
+    # move_agent() moves an existing oval with canvas.coords, so a frame costs as much
+    # as what changed in it rather than the size of the grid. Shared by the Floor is Lava
+    # and Q Learning vs SARSA GUIs, which put the repo root on sys.path when they start.
+    def __init__(self, canvas, colors, cell_size, outline='black'):
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.colors = np.array(colors, dtype=object)
+        rows, cols = self.colors.shape
+        self.cells = np.empty((rows, cols), dtype=object)
+        for i in range(rows):
+            for j in range(cols):
+                self.cells[i, j] = canvas.create_rectangle(
+                    j * cell_size, i * cell_size, (j + 1) * cell_size, (i + 1) * cell_size,
+                    fill=self.colors[i, j], outline=outline)
+        self.agents = {}
+
+    def set_colors(self, colors):
+        colors = np.asarray(colors, dtype=object)
+        for i, j in zip(*np.nonzero(colors != self.colors)):
+            self.canvas.itemconfigure(self.cells[i, j], fill=colors[i, j])
+        self.colors = colors
+
+    def set_cell(self, row, col, color):
+        if self.colors[row, col] != color:
+            self.canvas.itemconfigure(self.cells[row, col], fill=color)
+            self.colors[row, col] = color
+
+    def _oval(self, row, col, margin):
+        x, y = col * self.cell_size, row * self.cell_size
+        return x + margin, y + margin, x + self.cell_size - margin, y + self.cell_size - margin
+
+    def move_agent(self, name, pos, color='white', margin=10):
+        # Draws the agent on first use, then only moves it
+        row, col = pos
+        if name not in self.agents:
+            self.agents[name] = (self.canvas.create_oval(*self._oval(row, col, margin), fill=color), margin)
+        else:
+            item, margin = self.agents[name]
+            self.canvas.coords(item, *self._oval(row, col, margin))
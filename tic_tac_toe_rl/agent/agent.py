@@ -1,25 +1,53 @@
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+import copy
 import numpy as np
 from .q_learning import QLearning
+from .dense_q_learning import DenseQLearning
 from game.board import Board
+from utils.state_utils import (action_to_index, index_to_action,
+                               CANONICAL_CODES, TO_CANONICAL, FROM_CANONICAL)
+
+BACKENDS = {'dict': QLearning, 'dense': DenseQLearning}
 
 class Agent:
-    def __init__(self, player: int, learning_rate: float = 0.1, discount_factor: float = 0.9, exploration_rate: float = 0.1):
+    def __init__(self, player: int, learning_rate: float = 0.1, discount_factor: float = 0.9, exploration_rate: float = 0.1,
+                 backend: str = 'dict', replay_every: int = 1, exploration: str = 'epsilon', seed: Optional[int] = None):
         self.player = player  # 1 for X, -1 for O
-        self.q_learning = QLearning(learning_rate, discount_factor, exploration_rate)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown Q-table backend {backend!r}, expected one of {sorted(BACKENDS)}")
+        self.q_learning = BACKENDS[backend](learning_rate, discount_factor, exploration_rate,
+                                            replay_every=replay_every, exploration=exploration, seed=seed)
 
     def get_action(self, board: Board, training: bool = True) -> Tuple[int, int]:
         """Get the next action for the current board state."""
-        state = self.q_learning.get_state_key(board.get_board())
-        valid_moves = board.get_valid_moves()
-        return self.q_learning.get_action(state, valid_moves, training)
+        code = board.get_code()
+        state = int(CANONICAL_CODES[code])
+        valid_moves = self._to_canonical(code, board.get_valid_moves())
+        move = self.q_learning.get_action(state, valid_moves, training)
+        return index_to_action(FROM_CANONICAL[code, action_to_index(move)])
 
     def update(self, board: Board, action: Tuple[int, int], reward: float) -> None:
-        """Update the agent's Q-values based on the game outcome."""
-        state = self.q_learning.get_state_key(board.get_board())
-        next_state = self.q_learning.get_state_key(board.get_board())
-        next_valid_moves = board.get_valid_moves()
-        self.q_learning.update(state, action, reward, next_state, next_valid_moves)
+        """Update the agent's Q-values based on the game outcome (called after the move is made)."""
+        next_code = board.get_code()
+        cell_weight = 3 ** action_to_index(action)
+        code = next_code - (next_code // cell_weight % 3) * cell_weight  # the position this agent moved from
+        state = int(CANONICAL_CODES[code])
+        canonical_action = self._to_canonical(code, [action])[0]
+        next_state = int(CANONICAL_CODES[next_code])
+        next_valid_moves = self._to_canonical(next_code, board.get_valid_moves())
+        self.q_learning.update(state, canonical_action, reward, next_state, next_valid_moves)
+
+    @staticmethod
+    def _to_canonical(code: int, moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Map moves on the board with the given code onto its canonical orientation."""
+        to_canonical = TO_CANONICAL[code]
+        return [index_to_action(to_canonical[action_to_index(move)]) for move in moves]
+
+    def snapshot(self) -> "Agent":
+        """Copy of the agent that can be saved while this one keeps training."""
+        clone = copy.copy(self)
+        clone.q_learning = self.q_learning.snapshot()
+        return clone
 
     def save_model(self, filename: str) -> None:
         """Save the agent's Q-table to a file."""
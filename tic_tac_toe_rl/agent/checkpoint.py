@@ -0,0 +1,85 @@
+import sys
+import threading
+from typing import Dict, Optional
+
+class BackgroundCheckpointer:
+    """Saves agent checkpoints from a background thread.
+
+    submit() takes agent.snapshot() on the caller's thread and returns straight away; a
+    worker thread then calls save_model on the snapshot. If a file is submitted again before
+    its previous snapshot was written, only the newer snapshot is kept.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, object] = {}
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self.saved = 0
+        self._thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+        self._thread.start()
+
+    def submit(self, agent, filename: str) -> None:
+        """Queue a snapshot of agent to be written to filename."""
+        snapshot = agent.snapshot()
+        with self._cond:
+            self._raise_error()
+            if self._closed:
+                raise RuntimeError("Checkpointer is closed")
+            self._pending[filename] = snapshot
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Block until every submitted snapshot has been written."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._busy)
+            self._raise_error()
+
+    def close(self) -> None:
+        """Write the remaining snapshots and stop the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> "BackgroundCheckpointer":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Training already failed: still write what was submitted, but report a save error
+        # instead of raising it over the exception that is propagating
+        try:
+            self.close()
+        except Exception as error:
+            print(f"Checkpoint save failed: {error!r}", file=sys.stderr)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                filename, snapshot = self._pending.popitem()
+                self._busy = True
+            error = None
+            try:
+                snapshot.save_model(filename)
+            except BaseException as exc:  # surfaced to the training loop on its next call
+                error = exc
+            with self._cond:
+                if error is None:
+                    self.saved += 1
+                else:
+                    self._error = error
+                self._busy = False
+                self._cond.notify_all()
@@ -0,0 +1,178 @@
+import numpy as np
+from typing import Tuple, List, Optional
+import random
+from .q_learning import QLearning, ucb_scores
+from .model_file import save_model_file, load_model_file, is_model_file
+from utils.state_utils import (action_to_index, index_to_action, STATE_INDEX, LEGAL_MASKS,
+                               EQUIVALENT_ACTIONS, NUM_STATES, NUM_CELLS)
+
+class DenseQLearning(QLearning):
+    """Q-learning over a dense (n_states, 9) float32 table with one row per canonical state.
+
+    Takes the same canonical state codes and (row, col) actions as QLearning, so Agent
+    can use either backend. Illegal moves are excluded through LEGAL_MASKS rather than
+    stored, and symmetric updates only touch equivalent cells of the same row.
+    """
+
+    def __init__(self, learning_rate: float = 0.1, discount_factor: float = 0.9, exploration_rate: float = 0.3,
+                 memory_size: int = 10000, batch_size: int = 32, replay_every: int = 1,
+                 exploration: str = 'epsilon', ucb_c: float = 1.0, seed: Optional[int] = None,
+                 exploration_bonus: float = 0.1):
+        super().__init__(learning_rate, discount_factor, exploration_rate, memory_size, batch_size, replay_every,
+                         exploration, ucb_c, seed, exploration_bonus)
+        self.q_values = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.float32)
+
+    def _max_q(self, rows: np.ndarray, masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """Best legal Q-value for each row, 0.0 for terminal rows; masks default to LEGAL_MASKS[rows]."""
+        masks = LEGAL_MASKS[rows] if masks is None else masks
+        best = np.max(self.q_values[rows], axis=-1, where=masks, initial=-np.inf)
+        return np.where(masks.any(axis=-1), best, 0.0)
+
+    def get_action(self, state: int, valid_moves: List[Tuple[int, int]], training: bool = True) -> Tuple[int, int]:
+        """Choose an action using epsilon-greedy policy with decay and forced exploration, or UCB."""
+        row = self._row(state)
+        legal = LEGAL_MASKS[row]
+
+        if training:
+            min_exploration_rate = 0.1
+            decay_factor = 0.995
+            self.exploration_rate = max(
+                min_exploration_rate,
+                self.initial_exploration_rate * (decay_factor ** (self.training_steps / 1000))
+            )
+
+            if self.exploration == 'ucb':
+                scores = ucb_scores(self.q_values[row], self.visit_counts[row], legal, self.ucb_c)
+                return self._visit(row, index_to_action(random.choice(np.flatnonzero(scores == scores.max()))))
+
+            # Force exploration of unvisited moves
+            unvisited_moves = np.flatnonzero(legal & (self.visit_counts[row] == 0))
+            if len(unvisited_moves) and random.random() < 0.3:
+                return self._visit(row, index_to_action(random.choice(unvisited_moves)))
+
+            # Regular epsilon-greedy exploration
+            if random.random() < self.exploration_rate:
+                return self._visit(row, index_to_action(random.choice(np.flatnonzero(legal))))
+
+        # Exploitation: choose randomly among the best legal moves
+        q_row = np.where(legal, self.q_values[row], -np.inf)
+        return self._visit(row, index_to_action(random.choice(np.flatnonzero(q_row == q_row.max()))))
+
+    def update(self, state: int, action: Tuple[int, int], reward: float, next_state: int, next_valid_moves: List[Tuple[int, int]]) -> None:
+        """Update Q-values using Q-learning update rule and store experience in memory."""
+        row, move, next_row = self._row(state), action_to_index(action), self._row(next_state)
+        self.memory.append(row, move, reward, next_row, LEGAL_MASKS[next_row])
+
+        current_q = self.q_values[row, move]
+        next_max_q = self._max_q(next_row)
+        target = reward + self._bonus(row, move) + self.discount_factor * next_max_q
+        new_q = current_q + self.learning_rate * (target - current_q)
+        self._write_equivalent(np.array([row]), np.array([move]), np.array([new_q]))
+
+        if len(self.memory) >= self.batch_size and self.training_steps % self.replay_every == 0:
+            self._experience_replay()
+
+        self.training_steps += 1
+
+    def _write_equivalent(self, rows: np.ndarray, moves: np.ndarray, values: np.ndarray) -> None:
+        """Write values to each (row, move) and every cell equivalent to it by symmetry."""
+        batch, cells = np.nonzero(EQUIVALENT_ACTIONS[rows, moves])
+        self.q_values[rows[batch], cells] = values[batch]
+
+    def _experience_replay(self) -> None:
+        """Learn from a random batch of past experiences in one vectorized update."""
+        if len(self.memory) < self.batch_size:
+            return
+
+        rows, moves, rewards, next_rows, next_legal = self.memory.sample(self.batch_size)
+
+        current_q = self.q_values[rows, moves]
+        targets = rewards + self.discount_factor * self._max_q(next_rows, next_legal)
+        self._write_equivalent(rows, moves, current_q + self.learning_rate * (targets - current_q))
+
+    def get_actions(self, rows: np.ndarray, rng: np.random.Generator, training: bool = True) -> np.ndarray:
+        """Vectorized get_action: choose one canonical move index for each row of a batch."""
+        legal = LEGAL_MASKS[rows]
+        noise = rng.random(legal.shape)
+
+        # Greedy choice with random tie-breaking among the best legal moves
+        q_rows = np.where(legal, self.q_values[rows], -np.inf)
+        best = q_rows == q_rows.max(axis=1, keepdims=True)
+        moves = np.argmax(np.where(best, noise, -1.0), axis=1)
+
+        if training and self.exploration == 'ucb':
+            scores = ucb_scores(self.q_values[rows], self.visit_counts[rows], legal, self.ucb_c)
+            moves = np.argmax(np.where(scores == scores.max(axis=1, keepdims=True), noise, -1.0), axis=1)
+        elif training:
+            self.exploration_rate = max(
+                0.1, self.initial_exploration_rate * (0.995 ** (self.training_steps / 1000))
+            )
+            explore = rng.random(len(rows)) < self.exploration_rate
+            random_moves = np.argmax(np.where(legal, noise, -1.0), axis=1)
+            moves = np.where(explore, random_moves, moves)
+
+            # Forced exploration of unvisited moves takes precedence, as in get_action
+            unvisited = legal & (self.visit_counts[rows] == 0)
+            force = unvisited.any(axis=1) & (rng.random(len(rows)) < 0.3)
+            unvisited_moves = np.argmax(np.where(unvisited, noise, -1.0), axis=1)
+            moves = np.where(force, unvisited_moves, moves)
+
+        batch, cells = np.nonzero(EQUIVALENT_ACTIONS[rows, moves])
+        np.add.at(self.visit_counts, (rows[batch], cells), 1)
+        return moves
+
+    def update_batch(self, rows: np.ndarray, moves: np.ndarray, rewards: np.ndarray, next_rows: np.ndarray) -> None:
+        """Vectorized update for a batch of transitions.
+
+        Transitions that share a (state, move) pair are averaged into a single TD step
+        so that thousands of games opening with the same move do not overshoot.
+        """
+        current_q = self.q_values[rows, moves]
+        td_errors = rewards + self._bonus(rows, moves) + self.discount_factor * self._max_q(next_rows) - current_q
+
+        pairs, inverse = np.unique(rows * NUM_CELLS + moves, return_inverse=True)
+        mean_td = np.bincount(inverse, weights=td_errors) / np.bincount(inverse)
+        pair_rows, pair_moves = np.divmod(pairs, NUM_CELLS)
+        new_q = self.q_values[pair_rows, pair_moves] + self.learning_rate * mean_td
+        self._write_equivalent(pair_rows, pair_moves, new_q)
+        self.training_steps += len(rows)
+
+    def snapshot(self) -> "DenseQLearning":
+        """Copy of the learner with its own copy of everything save_q_table writes."""
+        clone = super().snapshot()
+        clone.q_values = np.array(self.q_values)
+        return clone
+
+    def save_q_table(self, filename: str) -> None:
+        """Atomically save the dense Q-table and visit counts in the binary model format."""
+        save_model_file(filename, self.q_values, self.visit_counts, self.training_steps)
+
+    def load_q_table(self, filename: str) -> None:
+        """Memory-map a binary model, or load a pickled dense/dict checkpoint and convert it."""
+        if is_model_file(filename):
+            self.q_values, visits, self.training_steps = load_model_file(filename)
+            if self.q_values.shape != (NUM_STATES, NUM_CELLS):
+                raise ValueError(f"{filename} holds a {self.q_values.shape} table, expected {(NUM_STATES, NUM_CELLS)}")
+            if visits is None:
+                visits = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.uint32)
+            self.visit_counts = visits
+            return
+
+        import pickle
+        with open(filename, 'rb') as f:
+            save_data = pickle.load(f)
+        if isinstance(save_data, dict) and save_data.get('backend') == 'dense':
+            self.q_values = np.asarray(save_data['q_values'], dtype=np.float32)
+            self.visit_counts = np.asarray(save_data['visited'], dtype=np.uint32)
+            self.training_steps = save_data.get('training_steps', 0)
+            return
+
+        super().load_q_table(filename)
+        self.q_values = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.float32)
+        for state, actions in self.q_table.items():
+            if STATE_INDEX[state] < 0:
+                continue  # symmetric duplicates carry no extra information
+            row = STATE_INDEX[state]
+            for action, value in actions.items():
+                self.q_values[row, action_to_index(action)] = value
+        self.q_table = {}
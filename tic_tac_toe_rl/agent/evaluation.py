@@ -0,0 +1,22 @@
+import numpy as np
+from typing import Optional, Tuple
+from .policy import PolicyAgent, compile_policy
+from game.solver import load_solution
+from utils.state_utils import CANONICAL_STATES, TERMINAL, POWERS
+
+def positions_to_move(player: int) -> np.ndarray:
+    """Canonical codes of all unfinished reachable positions where `player` (1 X, -1 O) moves."""
+    pieces = np.count_nonzero((CANONICAL_STATES[:, None] // POWERS) % 3, axis=1)
+    x_to_move = pieces % 2 == 0
+    return CANONICAL_STATES[~TERMINAL[CANONICAL_STATES] & (x_to_move if player == 1 else ~x_to_move)]
+
+def optimal_move_rate(agent, solution: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> float:
+    """Fraction of positions where the agent's greedy move preserves the game-theoretic value.
+
+    Works for Agent (either backend) and PolicyAgent, scoring every position the agent
+    can face in one vectorized lookup against the solved game.
+    """
+    _, optimal = solution if solution is not None else load_solution()
+    policy = agent.policy if isinstance(agent, PolicyAgent) else compile_policy(agent)
+    codes = positions_to_move(agent.player)
+    return float(np.mean(optimal[codes, policy[codes]]))
@@ -0,0 +1,88 @@
+import numpy as np
+
+EVICTION_POLICIES = ('lru', 'least_visited')
+_MASK64 = (1 << 64) - 1
+
+def _mix(code: int) -> int:
+    """splitmix64 finalizer, spreading consecutive board codes over the table."""
+    z = (code * 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+class HashedQStore:
+    """Fixed-capacity open-addressing table of Q-rows keyed by board code.
+
+    A key lives within `probe_limit` slots of its home slot (linear probing). When all of
+    them are taken, the least recently used or least visited row in that window is
+    evicted and reused, so memory never grows past `capacity` rows. Slots are never
+    emptied, so a lookup can stop at the first empty slot.
+    """
+
+    def __init__(self, capacity: int, n_actions: int, probe_limit: int = 8, eviction: str = 'lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}, expected one of {EVICTION_POLICIES}")
+        self.capacity = capacity
+        self.n_actions = n_actions
+        self.probe_limit = min(probe_limit, capacity)
+        self.eviction = eviction
+        # Codes are stored modulo 2**64; boards with more than 40 cells can in principle alias
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.occupied = np.zeros(capacity, dtype=bool)
+        self.q_values = np.zeros((capacity, n_actions), dtype=np.float32)
+        self.visits = np.zeros(capacity, dtype=np.uint32)
+        self.last_used = np.zeros(capacity, dtype=np.uint64)
+        self.clock = 0
+        self.size = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _probe(self, code: int):
+        """Slots to try for a code, home slot first."""
+        home = _mix(code) % self.capacity
+        return [(home + i) % self.capacity for i in range(self.probe_limit)]
+
+    def find(self, code: int) -> int:
+        """Slot holding a code, or -1 if it is not stored."""
+        key = code & _MASK64
+        for slot in self._probe(code):
+            if not self.occupied[slot]:
+                return -1
+            if self.keys[slot] == key:
+                self._touch(slot)
+                return slot
+        return -1
+
+    def get_or_insert(self, code: int) -> int:
+        """Slot holding a code, inserting a zeroed row (evicting if needed) when it is missing."""
+        key = code & _MASK64
+        window = self._probe(code)
+        for slot in window:
+            if not self.occupied[slot]:
+                self.occupied[slot] = True
+                self.size += 1
+                return self._reset_slot(slot, key)
+            if self.keys[slot] == key:
+                self._touch(slot)
+                return slot
+
+        scores = self.last_used[window] if self.eviction == 'lru' else self.visits[window]
+        self.evictions += 1
+        return self._reset_slot(window[int(np.argmin(scores))], key)
+
+    def _reset_slot(self, slot: int, key: int) -> int:
+        self.keys[slot] = key
+        self.q_values[slot] = 0.0
+        self.visits[slot] = 0
+        self._touch(slot)
+        return slot
+
+    def _touch(self, slot: int) -> None:
+        self.clock += 1
+        self.last_used[slot] = self.clock
+
+    def nbytes(self) -> int:
+        """Memory held by the table arrays."""
+        return sum(a.nbytes for a in (self.keys, self.occupied, self.q_values, self.visits, self.last_used))
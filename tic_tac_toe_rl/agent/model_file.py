@@ -0,0 +1,94 @@
+"""
+Versioned binary model format for dense Q-tables.
+
+Layout: a fixed 64-byte header followed by the float32 Q-array and, optionally, a uint32
+visit-count array of the same shape, both C-ordered. The arrays start at aligned offsets,
+so a model can be opened with np.memmap without copying or unpickling anything.
+"""
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from typing import Optional, Tuple
+
+MAGIC = b"TTTQ"
+VERSION = 1
+HEADER_SIZE = 64
+# magic, version, flags, n_states, n_actions, training_steps
+_HEADER = struct.Struct("<4sHHIIQ")
+FLAG_VISITS = 1
+
+@contextmanager
+def atomic_write(filename: str):
+    """Yield a binary file handle whose contents replace `filename` only once fully written."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + ".", suffix=".tmp")
+    umask = os.umask(0)
+    os.umask(umask)
+    try:
+        os.fchmod(fd, 0o666 & ~umask)  # mkstemp creates 0600 files
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def is_model_file(filename: str) -> bool:
+    """Check whether a file starts with the binary model magic."""
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def save_model_file(filename: str, q_values: np.ndarray, visits: Optional[np.ndarray] = None,
+                    training_steps: int = 0) -> None:
+    """Atomically write a Q-table (and optional visit counts) in the binary model format."""
+    q_values = np.ascontiguousarray(q_values, dtype=np.float32)
+    n_states, n_actions = q_values.shape
+    flags = FLAG_VISITS if visits is not None else 0
+    header = _HEADER.pack(MAGIC, VERSION, flags, n_states, n_actions, training_steps)
+    with atomic_write(filename) as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(q_values.tobytes())
+        if visits is not None:
+            f.write(np.ascontiguousarray(visits, dtype=np.uint32).tobytes())
+
+def load_model_file(filename: str, mode: str = "c") -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+    """Memory-map a binary model and return (q_values, visits or None, training_steps).
+
+    The default copy-on-write mode lets training modify the arrays in memory without
+    touching the file; pass mode="r" for a read-only view.
+    """
+    with open(filename, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{filename} is too short to be a model file")
+    magic, version, flags, n_states, n_actions, training_steps = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a model file")
+    if version > VERSION:
+        raise ValueError(f"{filename} uses model format version {version}, newest supported is {VERSION}")
+
+    shape = (n_states, n_actions)
+    q_values = np.memmap(filename, dtype=np.float32, mode=mode, offset=HEADER_SIZE, shape=shape)
+    visits = None
+    if flags & FLAG_VISITS:
+        visits = np.memmap(filename, dtype=np.uint32, mode=mode, offset=HEADER_SIZE + q_values.nbytes, shape=shape)
+    return q_values, visits, training_steps
+
+def migrate_pickle(pickle_file: str, model_file: str) -> None:
+    """Convert a pickled checkpoint (dict or dense backend) into the binary model format."""
+    from .dense_q_learning import DenseQLearning
+    learner = DenseQLearning()
+    learner.load_q_table(pickle_file)
+    learner.save_q_table(model_file)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python -m agent.model_file OLD.pkl NEW.qtab")
+        sys.exit(1)
+    migrate_pickle(sys.argv[1], sys.argv[2])
@@ -0,0 +1,82 @@
+import random
+import copy
+import numpy as np
+from typing import Tuple
+from .hashed_q_store import HashedQStore
+from .model_file import atomic_write
+from game.nk_board import NKBoard
+
+class NKAgent:
+    """Q-learning agent for NKBoard games, backed by a memory-bounded HashedQStore.
+
+    The 3x3 symmetry tables do not apply here, so positions are keyed by their raw base-3
+    code; the store's capacity caps memory however many positions self-play reaches.
+    """
+
+    def __init__(self, player: int, size: int = 4, learning_rate: float = 0.1, discount_factor: float = 0.9,
+                 exploration_rate: float = 0.3, capacity: int = 1 << 20, eviction: str = 'lru'):
+        self.player = player  # 1 for X, -1 for O
+        self.size = size
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.initial_exploration_rate = exploration_rate
+        self.exploration_rate = exploration_rate
+        self.training_steps = 0
+        self.store = HashedQStore(capacity, size * size, eviction=eviction)
+
+    def get_action(self, board: NKBoard, training: bool = True) -> Tuple[int, int]:
+        """Get the next action for the current board state (epsilon-greedy while training)."""
+        slot = self.store.get_or_insert(board.get_code())
+        legal = np.flatnonzero(board.board.ravel() == 0)
+        self.store.visits[slot] += 1
+
+        if training:
+            self.exploration_rate = max(
+                0.1, self.initial_exploration_rate * (0.995 ** (self.training_steps / 1000))
+            )
+            if random.random() < self.exploration_rate:
+                return divmod(int(random.choice(legal)), self.size)
+
+        q_values = self.store.q_values[slot, legal]
+        return divmod(int(random.choice(legal[q_values == q_values.max()])), self.size)
+
+    def update(self, board: NKBoard, action: Tuple[int, int], reward: float) -> None:
+        """Update the agent's Q-values after its move (called once the move is made)."""
+        next_code = board.get_code()
+        cell = action[0] * self.size + action[1]
+        code = next_code - (next_code // 3 ** cell % 3) * 3 ** cell  # the position this agent moved from
+
+        next_max_q = 0.0
+        if not board.is_game_over():
+            next_slot = self.store.find(next_code)
+            if next_slot >= 0:
+                next_max_q = float(self.store.q_values[next_slot, board.board.ravel() == 0].max())
+
+        slot = self.store.get_or_insert(code)
+        current_q = self.store.q_values[slot, cell]
+        self.store.q_values[slot, cell] = current_q + self.learning_rate * (
+            reward + self.discount_factor * next_max_q - current_q)
+        self.training_steps += 1
+
+    def snapshot(self) -> "NKAgent":
+        """Copy of the agent that can be saved while this one keeps training."""
+        clone = copy.copy(self)
+        clone.store = copy.deepcopy(self.store)
+        return clone
+
+    def save_model(self, filename: str) -> None:
+        """Save the hashed Q-store to an .npz file."""
+        store = self.store
+        with atomic_write(filename) as f:
+            np.savez(f, keys=store.keys, occupied=store.occupied, q_values=store.q_values, visits=store.visits,
+                     last_used=store.last_used, meta=np.array([store.clock, store.size, self.training_steps]))
+
+    def load_model(self, filename: str) -> None:
+        """Load a hashed Q-store saved by save_model."""
+        store = self.store
+        with np.load(filename) as data:
+            if data['q_values'].shape != store.q_values.shape:
+                raise ValueError(f"{filename} holds a {data['q_values'].shape} store, expected {store.q_values.shape}")
+            for name in ('keys', 'occupied', 'q_values', 'visits', 'last_used'):
+                setattr(store, name, data[name].copy())
+            store.clock, store.size, self.training_steps = (int(v) for v in data['meta'])
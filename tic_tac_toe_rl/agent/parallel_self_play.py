@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+from .agent import Agent
+from .dense_q_learning import DenseQLearning
+from .self_play import batched_self_play
+
+def _snapshot(learner: DenseQLearning) -> dict:
+    """Everything a worker needs to rebuild a learner."""
+    return {
+        'q_values': learner.q_values,
+        'visit_counts': learner.visit_counts,
+        'training_steps': learner.training_steps,
+        'params': (learner.learning_rate, learner.discount_factor, learner.initial_exploration_rate,
+                   learner.exploration, learner.ucb_c),
+    }
+
+def _restore(snapshot: dict) -> Agent:
+    """Rebuild a dense agent from a snapshot inside a worker."""
+    agent = Agent(player=1, backend='dense')
+    learner = agent.q_learning
+    (learner.learning_rate, learner.discount_factor, learner.initial_exploration_rate,
+     learner.exploration, learner.ucb_c) = snapshot['params']
+    learner.q_values = snapshot['q_values'].copy()
+    learner.visit_counts = snapshot['visit_counts'].copy()
+    learner.training_steps = snapshot['training_steps']
+    return agent
+
+def _compact_delta(learner: DenseQLearning, snapshot: dict) -> tuple:
+    """Changed entries as (Q indices, Q deltas, visited indices, visit-count deltas, steps taken)."""
+    delta = (learner.q_values - snapshot['q_values']).ravel()
+    changed = np.flatnonzero(delta).astype(np.int32)
+    visit_delta = (learner.visit_counts - snapshot['visit_counts']).ravel()
+    visited = np.flatnonzero(visit_delta).astype(np.int32)
+    return (changed, delta[changed], visited, visit_delta[visited],
+            learner.training_steps - snapshot['training_steps'])
+
+def _play_shard(args) -> Tuple[tuple, tuple, Tuple[int, int, int], float]:
+    """Worker: self-play `games` games against the snapshots and return compact deltas."""
+    snapshot_x, snapshot_o, games, batch_size, seed = args
+    agent_x, agent_o = _restore(snapshot_x), _restore(snapshot_o)
+    start = time.perf_counter()
+    outcomes = batched_self_play(agent_x, agent_o, games, batch_size, np.random.default_rng(seed))
+    elapsed = time.perf_counter() - start
+    return (_compact_delta(agent_x.q_learning, snapshot_x), _compact_delta(agent_o.q_learning, snapshot_o),
+            outcomes, games / elapsed)
+
+def _merge(learner: DenseQLearning, deltas: List[tuple]) -> None:
+    """Apply the average of the workers' deltas, counting only workers that changed each entry."""
+    size = learner.q_values.size
+    total = np.zeros(size)
+    touched = np.zeros(size)
+    visit_counts = learner.visit_counts.reshape(-1)
+    for changed, values, visited, visits, steps in deltas:
+        np.add.at(total, changed, values)
+        np.add.at(touched, changed, 1)
+        np.add.at(visit_counts, visited, visits)
+        learner.training_steps += steps
+    mask = touched > 0
+    learner.q_values.ravel()[mask] += (total[mask] / touched[mask]).astype(np.float32)
+
+class ParallelSelfPlay:
+    """Batched self-play sharded over a pool of worker processes.
+
+    Every round, each worker plays `sync_every` games with its own RNG stream against a
+    snapshot of both agents' dense tables and sends back only the entries it changed. The
+    parent averages those deltas into the agents before the next round. Use as a context
+    manager so the pool is shut down.
+    """
+
+    def __init__(self, agent_x: Agent, agent_o: Agent, workers: Optional[int] = None, sync_every: int = 16384,
+                 batch_size: int = 16384, seed: Optional[int] = None):
+        if not all(isinstance(agent.q_learning, DenseQLearning) for agent in (agent_x, agent_o)):
+            raise ValueError("Parallel self-play requires agents created with backend='dense'")
+        self.agent_x = agent_x
+        self.agent_o = agent_o
+        self.workers = workers or os.cpu_count() or 1
+        self.sync_every = sync_every
+        self.batch_size = batch_size
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.worker_rates: List[float] = []  # games/sec of each worker in the last round
+        self.pool = multiprocessing.Pool(self.workers)
+
+    def play(self, games: int) -> Tuple[int, int, int]:
+        """Play `games` games across the pool and return (X wins, O wins, draws)."""
+        wins_x = wins_o = draws = 0
+        remaining = games
+        while remaining > 0:
+            round_games = min(remaining, self.workers * self.sync_every)
+            shards = [round_games // self.workers + (i < round_games % self.workers) for i in range(self.workers)]
+            shards = [shard for shard in shards if shard]
+            snapshot_x = _snapshot(self.agent_x.q_learning)
+            snapshot_o = _snapshot(self.agent_o.q_learning)
+            seeds = self.seed_sequence.spawn(len(shards))
+            results = self.pool.map(_play_shard, [(snapshot_x, snapshot_o, shard, self.batch_size, seed)
+                                                  for shard, seed in zip(shards, seeds)])
+
+            _merge(self.agent_x.q_learning, [result[0] for result in results])
+            _merge(self.agent_o.q_learning, [result[1] for result in results])
+            for _, _, (x, o, d), _ in results:
+                wins_x, wins_o, draws = wins_x + x, wins_o + o, draws + d
+            self.worker_rates = [result[3] for result in results]
+            remaining -= round_games
+        return wins_x, wins_o, draws
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self) -> "ParallelSelfPlay":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't wait on workers that may be mid-batch when training was interrupted
+            self.pool.terminate()
+            self.pool.join()
@@ -0,0 +1,60 @@
+import numpy as np
+from typing import Optional, Tuple
+from .agent import Agent
+from .dense_q_learning import DenseQLearning
+from .model_file import atomic_write
+from utils.state_utils import (action_to_index, index_to_action, CANONICAL_CODES, CANONICAL_STATES, STATE_INDEX,
+                               FROM_CANONICAL, LEGAL_MASKS, REACHABLE, TERMINAL, NUM_CODES, NUM_STATES, NUM_CELLS)
+
+def canonical_q_values(agent: Agent) -> np.ndarray:
+    """(n_states, 9) Q-values of any backend, one row per canonical state, in the learner's dtype.
+
+    The dict backend keeps float64 values; narrowing them before the argmax would turn
+    near-equal values into ties. A dict-backend state that is absent gets 0.0 for every
+    move, as get_action initializes it; a move missing from a state that is in the table
+    also counts as 0.0, which is how get_action's greedy choice treats it.
+    """
+    learner = agent.q_learning
+    if isinstance(learner, DenseQLearning):
+        return np.array(learner.q_values)
+    q_values = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.float64)
+    for row, state in enumerate(CANONICAL_STATES.tolist()):
+        for action, value in learner.q_table.get(state, {}).items():
+            q_values[row, action_to_index(action)] = value
+    return q_values
+
+def compile_policy(agent: Agent) -> np.ndarray:
+    """Greedy move cell for every board code, already mapped back out of the canonical frame.
+
+    Entries for unreachable or finished positions are -1.
+    """
+    q_values = canonical_q_values(agent)
+    codes = np.flatnonzero(REACHABLE & ~TERMINAL)
+    rows = STATE_INDEX[CANONICAL_CODES[codes]]
+    best = np.argmax(np.where(LEGAL_MASKS[rows], q_values[rows], -np.inf), axis=1)
+    policy = np.full(NUM_CODES, -1, dtype=np.int8)
+    policy[codes] = FROM_CANONICAL[codes, best]
+    return policy
+
+def export_policy(agent: Agent, filename: str) -> None:
+    """Compile a trained agent into a board-code -> move table and save it as .npy."""
+    with atomic_write(filename) as f:
+        np.save(f, compile_policy(agent))
+
+class PolicyAgent:
+    """Inference-only agent that answers get_action with a single table lookup."""
+
+    def __init__(self, player: int, policy: Optional[np.ndarray] = None):
+        self.player = player  # 1 for X, -1 for O
+        self.policy = policy
+
+    def load_model(self, filename: str) -> None:
+        """Load a policy table written by export_policy."""
+        self.policy = np.load(filename)
+
+    def get_action(self, board, training: bool = False) -> Tuple[int, int]:
+        """Get the move the compiled policy plays on the current board."""
+        cell = self.policy[board.get_code()]
+        if cell < 0:
+            raise ValueError("The policy has no move for a finished or unreachable position")
+        return index_to_action(cell)
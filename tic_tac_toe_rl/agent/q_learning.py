@@ -1,36 +1,64 @@
 import numpy as np
-from typing import Dict, Tuple, List, Deque
+from typing import Dict, Tuple, List, Optional
 import random
-from collections import deque
-from utils.state_utils import get_symmetrical_states, get_symmetrical_action
+import ast
+import copy
+from .replay_buffer import ReplayBuffer
+from .model_file import atomic_write
+from utils.state_utils import (encode_board, action_to_index, index_to_action, CANONICAL_CODES, TO_CANONICAL,
+                               STATE_INDEX, LEGAL_MASKS, EQUIVALENT_ACTIONS, NUM_STATES, NUM_CELLS)
+
+EXPLORATION_MODES = ('epsilon', 'ucb')
+
+def ucb_scores(q_values: np.ndarray, counts: np.ndarray, legal: np.ndarray, c: float) -> np.ndarray:
+    """UCB1 scores Q + c * sqrt(ln N / n) over the last axis; untried legal moves score +inf, illegal -inf."""
+    total = np.sum(counts, axis=-1, where=legal, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bonus = c * np.sqrt(np.log(np.maximum(total, 1)) / counts)
+    scores = np.where(counts == 0, np.inf, q_values + bonus)
+    return np.where(legal, scores, -np.inf)
 
 class QLearning:
     def __init__(self, learning_rate: float = 0.1, discount_factor: float = 0.9, exploration_rate: float = 0.3,
-                 memory_size: int = 10000, batch_size: int = 32):
+                 memory_size: int = 10000, batch_size: int = 32, replay_every: int = 1,
+                 exploration: str = 'epsilon', ucb_c: float = 1.0, seed: Optional[int] = None,
+                 exploration_bonus: float = 0.1):
+        if exploration not in EXPLORATION_MODES:
+            raise ValueError(f"Unknown exploration mode {exploration!r}, expected one of {EXPLORATION_MODES}")
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.initial_exploration_rate = exploration_rate
         self.exploration_rate = exploration_rate
         self.memory_size = memory_size
         self.batch_size = batch_size
-        self.q_table: Dict[str, Dict[Tuple[int, int], float]] = {}
-        self.memory: Deque[Tuple[str, Tuple[int, int], float, str, List[Tuple[int, int]]]] = deque(maxlen=memory_size)
+        self.replay_every = replay_every  # replay one batch every this many updates
+        self.exploration = exploration  # 'epsilon' (forced + epsilon-greedy) or 'ucb'
+        self.ucb_c = ucb_c
+        self.exploration_bonus = exploration_bonus  # c in the c / sqrt(1 + N(s, a)) bonus of each update
+        self.q_table: Dict[int, Dict[Tuple[int, int], float]] = {}
+        self.memory = ReplayBuffer(memory_size, seed)  # seed makes replay batches reproducible
         self.training_steps = 0
-        self.visited_states = set()
-
-    def get_state_key(self, board: np.ndarray) -> str:
-        """Convert board state to string key, using the canonical form."""
-        # Get all symmetrical states
-        symmetrical_states = get_symmetrical_states(board)
-        # Convert all states to strings
-        state_strings = [str(state.tolist()) for state in symmetrical_states]
-        # Return the lexicographically smallest state (canonical form)
-        return min(state_strings)
-
-    def get_action(self, state: str, valid_moves: List[Tuple[int, int]], training: bool = True) -> Tuple[int, int]:
-        """Choose an action using epsilon-greedy policy with decay and forced exploration."""
+        # Times each canonical (state, move) was chosen, counting symmetry-equivalent moves together
+        self.visit_counts = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.uint32)
+
+    @staticmethod
+    def _row(state: int) -> int:
+        """Row of the visit counts (and dense table) holding a canonical state code."""
+        row = int(STATE_INDEX[state])
+        if row < 0:
+            raise ValueError(f"State code {state} is not a reachable canonical position")
+        return row
+
+    def get_state_key(self, board: np.ndarray) -> int:
+        """Convert board state to its canonical base-3 code (smallest code among its symmetries)."""
+        return int(CANONICAL_CODES[encode_board(board)])
+
+    def get_action(self, state: int, valid_moves: List[Tuple[int, int]], training: bool = True) -> Tuple[int, int]:
+        """Choose an action using epsilon-greedy policy with decay and forced exploration, or UCB."""
+        row = self._row(state)
         if state not in self.q_table:
             self.q_table[state] = {move: 0.0 for move in valid_moves}
+        counts = self.visit_counts[row]
 
         # Decay exploration rate over time, but keep a minimum value
         if training:
@@ -41,32 +69,50 @@ class QLearning:
                 self.initial_exploration_rate * (decay_factor ** (self.training_steps / 1000))
             )
 
-            # Force exploration of unvisited states
-            unvisited_moves = [move for move in valid_moves if (state, move) not in self.visited_states]
+            if self.exploration == 'ucb':
+                q_values = np.zeros(NUM_CELLS)
+                legal = np.zeros(NUM_CELLS, dtype=bool)
+                for move in valid_moves:
+                    q_values[action_to_index(move)] = self.q_table[state].get(move, 0.0)
+                    legal[action_to_index(move)] = True
+                scores = ucb_scores(q_values, counts, legal, self.ucb_c)
+                return self._visit(row, index_to_action(random.choice(np.flatnonzero(scores == scores.max()))))
+
+            # Force exploration of unvisited moves
+            unvisited_moves = [move for move in valid_moves if counts[action_to_index(move)] == 0]
             if unvisited_moves and random.random() < 0.3:  # 30% chance to force exploration
-                move = random.choice(unvisited_moves)
-                self.visited_states.add((state, move))
-                return move
+                return self._visit(row, random.choice(unvisited_moves))
 
             # Regular epsilon-greedy exploration
             if random.random() < self.exploration_rate:
-                move = random.choice(valid_moves)
-                self.visited_states.add((state, move))
-                return move
+                return self._visit(row, random.choice(valid_moves))
 
-        # Exploitation: choose the best known action
+        # Exploitation: choose the best legal action; unseen moves count as 0.0
         state_actions = self.q_table[state]
-        best_moves = [move for move, value in state_actions.items() 
-                     if value == max(state_actions.values())]
-        move = random.choice(best_moves)  # Randomly choose among best moves
-        self.visited_states.add((state, move))
+        values = [state_actions.get(move, 0.0) for move in valid_moves]
+        best_value = max(values)
+        best_moves = [move for move, value in zip(valid_moves, values) if value == best_value]
+        return self._visit(row, random.choice(best_moves))  # Randomly choose among best moves
+
+    def _bonus(self, rows: np.ndarray, moves: np.ndarray) -> np.ndarray:
+        """Count-based exploration bonus c / sqrt(1 + N(s, a)), N being the visits before this one.
+
+        get_action has already counted the move being updated, so that is c / sqrt(visit_counts).
+        """
+        return self.exploration_bonus / np.sqrt(np.maximum(self.visit_counts[rows, moves], 1))
+
+    def _visit(self, row: int, move: Tuple[int, int]) -> Tuple[int, int]:
+        """Count a visit to a move and every move equivalent to it, then return the move."""
+        self.visit_counts[row, EQUIVALENT_ACTIONS[row, action_to_index(move)]] += 1
         return move
 
-    def update(self, state: str, action: Tuple[int, int], reward: float, next_state: str, next_valid_moves: List[Tuple[int, int]]) -> None:
+    def update(self, state: int, action: Tuple[int, int], reward: float, next_state: int, next_valid_moves: List[Tuple[int, int]]) -> None:
         """Update Q-values using Q-learning update rule and store experience in memory."""
         # Store experience in memory
-        self.memory.append((state, action, reward, next_state, next_valid_moves))
-        
+        next_legal = np.zeros(NUM_CELLS, dtype=bool)
+        next_legal[[action_to_index(move) for move in next_valid_moves]] = True
+        self.memory.append(state, action_to_index(action), reward, next_state, next_legal)
+
         # Initialize Q-values if not present
         if state not in self.q_table:
             self.q_table[state] = {action: 0.0}
@@ -76,60 +122,57 @@ class QLearning:
         # Update Q-value for the current state-action pair
         current_q = self.q_table[state].get(action, 0.0)
         next_max_q = max(self.q_table[next_state].values()) if next_valid_moves else 0.0
-        
-        # Add a small bonus for exploring new states
-        exploration_bonus = 0.1 if (state, action) not in self.visited_states else 0.0
-        new_q = current_q + self.learning_rate * (reward + exploration_bonus + self.discount_factor * next_max_q - current_q)
+        bonus = float(self._bonus(self._row(state), action_to_index(action)))
+        new_q = current_q + self.learning_rate * (reward + bonus + self.discount_factor * next_max_q - current_q)
         self.q_table[state][action] = new_q
 
         # Update symmetrical states
         self._update_symmetrical_states(state, action, new_q)
 
         # Experience replay
-        if len(self.memory) >= self.batch_size:
+        if len(self.memory) >= self.batch_size and self.training_steps % self.replay_every == 0:
             self._experience_replay()
 
         self.training_steps += 1
 
-    def _update_symmetrical_states(self, state: str, action: Tuple[int, int], q_value: float) -> None:
-        """Update Q-values for all symmetrical states and actions."""
-        # Convert string state back to numpy array
-        state_array = np.array(eval(state))
-        
-        # Get all symmetrical states and actions
-        symmetrical_states = get_symmetrical_states(state_array)
-        symmetrical_actions = get_symmetrical_action(action)
-        
-        # Update Q-values for all symmetrical states
-        for sym_state, sym_action in zip(symmetrical_states, symmetrical_actions):
-            sym_state_key = str(sym_state.tolist())
-            if sym_state_key not in self.q_table:
-                self.q_table[sym_state_key] = {}
-            self.q_table[sym_state_key][sym_action] = q_value
-            self.visited_states.add((sym_state_key, sym_action))
+    def _update_symmetrical_states(self, state: int, action: Tuple[int, int], q_value: float) -> None:
+        """Write q_value to the action and every action equivalent to it in the canonical state."""
+        # Only canonical codes are ever read, so the other symmetric boards are not stored
+        state_actions = self.q_table.setdefault(state, {})
+        for cell in np.flatnonzero(EQUIVALENT_ACTIONS[self._row(state), action_to_index(action)]).tolist():
+            state_actions[index_to_action(cell)] = q_value
 
     def _experience_replay(self) -> None:
-        """Learn from past experiences."""
+        """Learn from a random batch of past experiences."""
         if len(self.memory) < self.batch_size:
             return
 
-        # Sample random batch from memory
-        batch = random.sample(self.memory, self.batch_size)
-        
-        for state, action, reward, next_state, next_valid_moves in batch:
+        states, actions, rewards, next_states, next_legal = self.memory.sample(self.batch_size)
+        states, next_states = states.tolist(), next_states.tolist()
+        actions = [index_to_action(action) for action in actions]
+        for state, action, next_state, legal in zip(states, actions, next_states, next_legal):
             if state not in self.q_table:
                 self.q_table[state] = {action: 0.0}
             if next_state not in self.q_table:
-                self.q_table[next_state] = {move: 0.0 for move in next_valid_moves}
-
-            # Q-learning update
-            current_q = self.q_table[state].get(action, 0.0)
-            next_max_q = max(self.q_table[next_state].values()) if next_valid_moves else 0.0
-            new_q = current_q + self.learning_rate * (reward + self.discount_factor * next_max_q - current_q)
-            self.q_table[state][action] = new_q
-
-            # Update symmetrical states
-            self._update_symmetrical_states(state, action, new_q)
+                self.q_table[next_state] = {index_to_action(move): 0.0 for move in np.flatnonzero(legal)}
+
+        # Batch Q-learning update
+        current_q = np.array([self.q_table[state].get(action, 0.0) for state, action in zip(states, actions)])
+        has_moves = next_legal.any(axis=1)
+        next_max_q = np.array([max(self.q_table[next_state].values()) if moves else 0.0
+                               for next_state, moves in zip(next_states, has_moves)])
+        new_q = current_q + self.learning_rate * (rewards + self.discount_factor * next_max_q - current_q)
+
+        # Update symmetrical states (which include the sampled state itself)
+        for state, action, value in zip(states, actions, new_q.tolist()):
+            self._update_symmetrical_states(state, action, value)
+
+    def snapshot(self) -> "QLearning":
+        """Copy of the learner with its own copy of everything save_q_table writes."""
+        clone = copy.copy(self)
+        clone.q_table = {state: dict(moves) for state, moves in self.q_table.items()}
+        clone.visit_counts = self.visit_counts.copy()
+        return clone
 
     def save_q_table(self, filename: str) -> None:
         """Save Q-table and training metadata to file."""
@@ -137,9 +180,9 @@ class QLearning:
         save_data = {
             'q_table': self.q_table,
             'training_steps': self.training_steps,
-            'visited_states': self.visited_states
+            'visit_counts': self.visit_counts
         }
-        with open(filename, 'wb') as f:
+        with atomic_write(filename) as f:
             pickle.dump(save_data, f)
 
     def load_q_table(self, filename: str) -> None:
@@ -151,9 +194,47 @@ class QLearning:
             if isinstance(save_data, dict):
                 self.q_table = save_data.get('q_table', save_data)  # Try new format, fall back to old format
                 self.training_steps = save_data.get('training_steps', 0)
-                self.visited_states = save_data.get('visited_states', set())
+                visited_states = save_data.get('visited_states', set())
+                visit_counts = save_data.get('visit_counts')
             else:
                 # Old format where the file directly contained the q_table
                 self.q_table = save_data
                 self.training_steps = 0
-                self.visited_states = set() 
\ No newline at end of file
+                visited_states, visit_counts = set(), None
+        self._convert_string_keys()
+        self._canonicalize()
+        if visit_counts is None:
+            # Tables saved before visit counts only recorded (state, move) pairs; count each once
+            visit_counts = np.zeros((NUM_STATES, NUM_CELLS), dtype=np.uint32)
+            for state, action in visited_states:
+                code = state if isinstance(state, int) else encode_board(np.array(ast.literal_eval(state)))
+                if STATE_INDEX[code] >= 0:
+                    visit_counts[STATE_INDEX[code], action_to_index(action)] = 1
+        self.visit_counts = np.asarray(visit_counts, dtype=np.uint32)
+
+    def _convert_string_keys(self) -> None:
+        """Convert tables saved with str(board.tolist()) keys to base-3 integer codes."""
+        def to_code(key):
+            return encode_board(np.array(ast.literal_eval(key))) if isinstance(key, str) else key
+
+        self.q_table = {to_code(state): actions for state, actions in self.q_table.items()}
+
+    def _canonicalize(self) -> None:
+        """Reduce older tables, which stored all 8 symmetric boards, to legal moves of canonical states.
+
+        Those tables also credited moves to the board after the move, so entries for cells
+        that are occupied in the stored position are dropped.
+        """
+        table: Dict[int, Dict[Tuple[int, int], float]] = {}
+        # Canonical keys first, so their own entries win over ones mapped from a symmetric board
+        for code in sorted(self.q_table, key=lambda code: CANONICAL_CODES[code] != code):
+            canonical = int(CANONICAL_CODES[code])
+            row = STATE_INDEX[canonical]
+            if row < 0:
+                continue
+            state_actions = table.setdefault(canonical, {})
+            for move, value in self.q_table[code].items():
+                cell = int(TO_CANONICAL[code, action_to_index(move)])
+                if LEGAL_MASKS[row, cell]:
+                    state_actions.setdefault(index_to_action(cell), value)
+        self.q_table = {state: moves for state, moves in table.items() if moves}
@@ -0,0 +1,40 @@
+import numpy as np
+from typing import Optional, Tuple
+from utils.state_utils import NUM_CELLS
+
+class ReplayBuffer:
+    """Fixed-capacity ring of transitions stored column-wise in preallocated arrays.
+
+    Batches are drawn from the buffer's own generator, seeded by `seed`.
+    """
+
+    def __init__(self, capacity: int, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.next_legal = np.zeros((capacity, NUM_CELLS), dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, state: int, action: int, reward: float, next_state: int, next_legal: np.ndarray) -> None:
+        """Store one transition, overwriting the oldest once the buffer is full."""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.next_legal[i] = next_legal
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, ...]:
+        """Sample a batch (with replacement) as (states, actions, rewards, next_states, next_legal)."""
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return (self.states[idx], self.actions[idx].astype(np.intp), self.rewards[idx],
+                self.next_states[idx], self.next_legal[idx])
@@ -0,0 +1,45 @@
+import numpy as np
+from typing import Optional, Tuple
+from .agent import Agent
+from .dense_q_learning import DenseQLearning
+from utils.state_utils import CANONICAL_CODES, STATE_INDEX, FROM_CANONICAL, TERMINAL, WINNERS, NUM_CELLS, POWERS
+
+def batched_self_play(agent_x: Agent, agent_o: Agent, games: int, batch_size: int = 16384,
+                      rng: Optional[np.random.Generator] = None) -> Tuple[int, int, int]:
+    """Play and learn from `games` self-play games, advancing `batch_size` games per ply at once.
+
+    Both agents must use the dense backend. Boards are kept as base-3 codes, so each ply is
+    a handful of table lookups over the whole batch followed by one DenseQLearning.update_batch
+    per agent. Rewards follow Board.get_reward. Returns (X wins, O wins, draws).
+    """
+    learners = (agent_x.q_learning, agent_o.q_learning)
+    if not all(isinstance(learner, DenseQLearning) for learner in learners):
+        raise ValueError("Batched self-play requires agents created with backend='dense'")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    wins_x = wins_o = draws = 0
+    for start in range(0, games, batch_size):
+        codes = np.zeros(min(batch_size, games - start), dtype=np.int64)
+        for ply in range(NUM_CELLS):
+            learner = learners[ply % 2]
+            rows = STATE_INDEX[CANONICAL_CODES[codes]]
+            moves = learner.get_actions(rows, rng)
+
+            # Map canonical moves back onto each board and place the mover's digit (X=1, O=2)
+            cells = FROM_CANONICAL[codes, moves]
+            codes = codes + (1 + ply % 2) * POWERS[cells]
+
+            done = TERMINAL[codes]
+            winners = WINNERS[codes]
+            rewards = np.where(done, np.where(winners == 0, 0.5, np.where(winners == 1, 1.0, -1.0)), 0.0)
+            learner.update_batch(rows, moves, rewards, STATE_INDEX[CANONICAL_CODES[codes]])
+
+            finished = winners[done]
+            wins_x += int(np.count_nonzero(finished == 1))
+            wins_o += int(np.count_nonzero(finished == -1))
+            draws += int(np.count_nonzero(finished == 0))
+            codes = codes[~done]
+            if not len(codes):
+                break
+
+    return wins_x, wins_o, draws
@@ -0,0 +1,147 @@
+"""Fixed-seed micro-benchmarks for the self-play hot paths.
+
+Each case runs in a fresh process so its peak RSS is its own. Save a run with --json and
+pass it to --compare on a later run to flag throughput or memory regressions:
+
+    python benchmarks.py --json baseline.json
+    python benchmarks.py --compare baseline.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from game.bitboard import BitBoard
+from game.nk_board import NKBoard
+from agent.agent import Agent
+from agent.nk_agent import NKAgent
+from agent.self_play import batched_self_play
+
+SEED = 1234
+
+def _agents(backend: str) -> Tuple[Agent, Agent]:
+    """A seeded pair of agents; also reseeds the random module their moves are drawn from."""
+    random.seed(SEED)
+    return Agent(player=1, backend=backend, seed=SEED), Agent(player=-1, backend=backend, seed=SEED + 1)
+
+def _play(board, agent_x, agent_o, games: int) -> Dict[str, float]:
+    """Play games of sequential self-play and report throughput."""
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        board.reset()
+        while not board.is_game_over():
+            agent = agent_x if board.current_player == 1 else agent_o
+            action = agent.get_action(board, training=True)
+            board.make_move(*action)
+            agent.update(board, action, board.get_reward())
+            moves += 1
+    elapsed = time.perf_counter() - start
+    return {"games_per_s": games / elapsed, "moves_per_s": moves / elapsed}
+
+def _checkpoint_size(agent, suffix: str) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "agent" + suffix)
+        agent.save_model(filename)
+        return os.path.getsize(filename)
+
+def bench_dict_agent() -> Dict[str, float]:
+    agent_x, agent_o = _agents("dict")
+    result = _play(BitBoard(), agent_x, agent_o, 2000)
+    result["checkpoint_bytes"] = _checkpoint_size(agent_x, ".pkl")
+    return result
+
+def bench_dense_agent() -> Dict[str, float]:
+    agent_x, agent_o = _agents("dense")
+    result = _play(BitBoard(), agent_x, agent_o, 2000)
+    result["checkpoint_bytes"] = _checkpoint_size(agent_x, ".qtab")
+    return result
+
+def bench_batched_self_play() -> Dict[str, float]:
+    agent_x, agent_o = _agents("dense")
+    games = 200000
+    start = time.perf_counter()
+    batched_self_play(agent_x, agent_o, games, batch_size=16384, rng=np.random.default_rng(SEED))
+    elapsed = time.perf_counter() - start
+    return {"games_per_s": games / elapsed, "checkpoint_bytes": _checkpoint_size(agent_x, ".qtab")}
+
+def bench_nk_4x4() -> Dict[str, float]:
+    random.seed(SEED)
+    agent_x, agent_o = NKAgent(player=1, size=4, capacity=1 << 16), NKAgent(player=-1, size=4, capacity=1 << 16)
+    result = _play(NKBoard(4, 4), agent_x, agent_o, 1000)
+    result["checkpoint_bytes"] = _checkpoint_size(agent_x, ".npz")
+    return result
+
+BENCHMARKS: Dict[str, Callable[[], Dict[str, float]]] = {
+    "dict_agent": bench_dict_agent,
+    "dense_agent": bench_dense_agent,
+    "batched_self_play": bench_batched_self_play,
+    "nk_4x4": bench_nk_4x4,
+}
+
+# Metrics where a larger value is better; the rest (memory, file size) should not grow
+HIGHER_IS_BETTER = ("games_per_s", "moves_per_s")
+
+def _run_case(name: str) -> Dict[str, float]:
+    result = BENCHMARKS[name]()
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return result
+
+def run(names) -> Dict[str, Dict[str, float]]:
+    """Run each benchmark in its own spawned process."""
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(_run_case, (name,))
+    return results
+
+def compare(results, baseline, tolerance: float) -> int:
+    """Print metrics that got worse than baseline by more than tolerance; return how many did."""
+    regressions = 0
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old:
+                continue
+            change = value / old - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions += 1
+                print(f"REGRESSION {name}.{metric}: {old:,.1f} -> {value:,.1f} ({change:+.1%})")
+    return regressions
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run, from {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--json", metavar="PATH", help="write the results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline results to check against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown or growth")
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.names or list(BENCHMARKS))
+    for name, metrics in results.items():
+        print(f"{name:20s} " + "  ".join(f"{metric} {value:,.1f}" for metric, value in metrics.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(results, json.load(f), args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
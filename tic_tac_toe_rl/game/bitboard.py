@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Tuple, List
+from utils.state_utils import WIN_LINES
+
+# Cell i = row * 3 + col is bit i of each player's 9-bit mask.
+FULL_MASK = 0x1FF
+LINE_MASKS = tuple(sum(1 << int(cell) for cell in line) for line in WIN_LINES)
+
+# Lookup tables over every 9-bit mask, built once at import
+_WINNING = tuple(any(bits & mask == mask for mask in LINE_MASKS) for bits in range(FULL_MASK + 1))
+_MOVES = tuple(tuple(divmod(i, 3) for i in range(9) if free >> i & 1) for free in range(FULL_MASK + 1))
+_TERNARY = tuple(sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(FULL_MASK + 1))
+
+class BitBoard:
+    """Drop-in replacement for Board that stores the position as two 9-bit integers."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the board to initial state."""
+        self.x_bits = 0
+        self.o_bits = 0
+        self.current_player = 1  # 1 for X, -1 for O
+        self.game_over = False
+        self.winner = None
+
+    @property
+    def board(self) -> np.ndarray:
+        """The position as a 3x3 array of 0/1/-1, like Board.board."""
+        return self.get_board()
+
+    def make_move(self, row: int, col: int) -> bool:
+        """
+        Make a move at the specified position.
+        Returns True if move was valid and successful, False otherwise.
+        """
+        if self.game_over or not self.is_valid_move(row, col):
+            return False
+
+        bit = 1 << (row * 3 + col)
+        if self.current_player == 1:
+            self.x_bits |= bit
+        else:
+            self.o_bits |= bit
+        self.check_game_state()
+        self.current_player = -self.current_player
+        return True
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        """Check if the move is valid."""
+        return 0 <= row < 3 and 0 <= col < 3 and not (self.x_bits | self.o_bits) >> (row * 3 + col) & 1
+
+    def get_valid_moves(self) -> List[Tuple[int, int]]:
+        """Get list of all valid moves."""
+        return list(_MOVES[~(self.x_bits | self.o_bits) & FULL_MASK])
+
+    def check_game_state(self) -> None:
+        """Check if the player who just moved has completed a line, or the board is full."""
+        if _WINNING[self.x_bits if self.current_player == 1 else self.o_bits]:
+            self.game_over = True
+            self.winner = self.current_player
+        elif self.x_bits | self.o_bits == FULL_MASK:
+            self.game_over = True
+            self.winner = 0  # Draw
+
+    def get_state(self) -> str:
+        """Get string representation of the board state."""
+        return str(self.get_board().tolist())
+
+    def get_code(self) -> int:
+        """Get the base-3 code of the board (see utils.state_utils.encode_board)."""
+        return _TERNARY[self.x_bits] + 2 * _TERNARY[self.o_bits]
+
+    def get_reward(self) -> float:
+        """Get reward for the current state."""
+        if not self.game_over:
+            return 0
+        if self.winner == 0:
+            return 0.5  # Draw
+        return 1.0 if self.winner == 1 else -1.0
+
+    def get_board(self) -> np.ndarray:
+        """Get the current board state."""
+        cells = np.arange(9)
+        board = ((self.x_bits >> cells) & 1) - ((self.o_bits >> cells) & 1)
+        return board.reshape(3, 3)
+
+    def is_game_over(self) -> bool:
+        """Check if the game is over."""
+        return self.game_over
@@ -1,5 +1,6 @@
 import numpy as np
 from typing import Tuple, Optional, List
+from utils.state_utils import encode_board
 
 class Board:
     def __init__(self):
@@ -60,6 +61,10 @@ class Board:
         """Get string representation of the board state."""
         return str(self.board.tolist())
 
+    def get_code(self) -> int:
+        """Get the base-3 code of the board (see utils.state_utils.encode_board)."""
+        return encode_board(self.board)
+
     def get_reward(self) -> float:
         """Get reward for the current state."""
         if not self.game_over:
@@ -7,12 +7,13 @@ class Display:
         symbols = {0: ' ', 1: 'X', -1: 'O'}
         
         print("\n")
-        for i in range(3):
-            print("-------------")
-            for j in range(3):
+        rows, cols = board.shape
+        for i in range(rows):
+            print("----" * cols + "-")
+            for j in range(cols):
                 print(f"| {symbols[board[i, j]]} ", end="")
             print("|")
-        print("-------------")
+        print("----" * cols + "-")
         print("\n")
 
     @staticmethod
@@ -0,0 +1,97 @@
+import numpy as np
+from typing import Tuple, List
+
+# Line directions checked through the last move: horizontal, vertical and both diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+class NKBoard:
+    """size x size board won by k in a row, with the same API as Board.
+
+    Only the four lines through the last move are checked for a win, and the base-3 code
+    of the position is kept up to date move by move.
+    """
+
+    def __init__(self, size: int = 4, k: int = 4):
+        if not 1 <= k <= size:
+            raise ValueError(f"Need 1 <= k <= size, got size={size}, k={k}")
+        self.size = size
+        self.k = k
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the board to initial state."""
+        self.board = np.zeros((self.size, self.size), dtype=int)
+        self.current_player = 1  # 1 for X, -1 for O
+        self.game_over = False
+        self.winner = None
+        self.moves_made = 0
+        self.code = 0
+
+    def make_move(self, row: int, col: int) -> bool:
+        """
+        Make a move at the specified position.
+        Returns True if move was valid and successful, False otherwise.
+        """
+        if self.game_over or not self.is_valid_move(row, col):
+            return False
+
+        self.board[row, col] = self.current_player
+        self.moves_made += 1
+        self.code += (self.current_player % 3) * 3 ** (row * self.size + col)
+        self.check_game_state(row, col)
+        self.current_player *= -1
+        return True
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        """Check if the move is valid."""
+        return 0 <= row < self.size and 0 <= col < self.size and self.board[row, col] == 0
+
+    def get_valid_moves(self) -> List[Tuple[int, int]]:
+        """Get list of all valid moves."""
+        rows, cols = np.nonzero(self.board == 0)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def _run_length(self, row: int, col: int, dr: int, dc: int) -> int:
+        """Number of the current player's stones in a row from (row, col) along (dr, dc), excluding it."""
+        count = 0
+        row, col = row + dr, col + dc
+        while 0 <= row < self.size and 0 <= col < self.size and self.board[row, col] == self.current_player:
+            count += 1
+            row, col = row + dr, col + dc
+        return count
+
+    def check_game_state(self, row: int, col: int) -> None:
+        """Check whether the move at (row, col) completed k in a row, or filled the board."""
+        for dr, dc in DIRECTIONS:
+            if 1 + self._run_length(row, col, dr, dc) + self._run_length(row, col, -dr, -dc) >= self.k:
+                self.game_over = True
+                self.winner = self.current_player
+                return
+
+        if self.moves_made == self.size * self.size:
+            self.game_over = True
+            self.winner = 0  # Draw
+
+    def get_state(self) -> str:
+        """Get string representation of the board state."""
+        return str(self.board.tolist())
+
+    def get_code(self) -> int:
+        """Get the base-3 code of the board (empty=0, X=1, O=2, cell row * size + col is digit i)."""
+        return self.code
+
+    def get_reward(self) -> float:
+        """Get reward for the current state."""
+        if not self.game_over:
+            return 0
+        if self.winner == 0:
+            return 0.5  # Draw
+        return 1.0 if self.winner == 1 else -1.0
+
+    def get_board(self) -> np.ndarray:
+        """Get the current board state."""
+        return self.board.copy()
+
+    def is_game_over(self) -> bool:
+        """Check if the game is over."""
+        return self.game_over
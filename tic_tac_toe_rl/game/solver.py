@@ -0,0 +1,62 @@
+import os
+import zipfile
+import numpy as np
+from typing import Optional, Tuple
+from utils.state_utils import REACHABLE, TERMINAL, WINNERS, NUM_CODES, NUM_CELLS, POWERS
+
+# The solution is cached next to this module; bump the version when solve() changes
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solution.npz")
+SOLUTION_VERSION = 1
+
+def solve() -> Tuple[np.ndarray, np.ndarray]:
+    """Solve every reachable position by retrograde analysis, from full boards back to the empty one.
+
+    Returns (values, optimal): values[code] is the game-theoretic result from X's point of view
+    (1 X wins, 0 draw, -1 O wins), and optimal[code, cell] marks the moves that keep it. Both
+    arrays are indexed by board code, so they double as the transposition table.
+    """
+    digits = (np.arange(NUM_CODES, dtype=np.int64)[:, None] // POWERS) % 3
+    pieces = np.count_nonzero(digits, axis=1)
+    values = np.zeros(NUM_CODES, dtype=np.int8)
+    optimal = np.zeros((NUM_CODES, NUM_CELLS), dtype=bool)
+
+    for ply in range(NUM_CELLS, -1, -1):
+        codes = np.flatnonzero(REACHABLE & (pieces == ply))
+        finished = TERMINAL[codes]
+        values[codes[finished]] = WINNERS[codes[finished]]
+
+        codes = codes[~finished]
+        x_to_move = ply % 2 == 0
+        empty = digits[codes] == 0
+        children = codes[:, None] + (1 if x_to_move else 2) * POWERS
+        # Occupied cells get a value worse than any real outcome for the player to move
+        child_values = np.where(empty, values[np.where(empty, children, 0)], -2 if x_to_move else 2)
+        best = child_values.max(axis=1) if x_to_move else child_values.min(axis=1)
+        values[codes] = best
+        optimal[codes] = empty & (child_values == best[:, None])
+
+    return values, optimal
+
+def _load_cached(cache_file: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """The cached (values, optimal), or None if the file is missing, unreadable or stale."""
+    try:
+        with np.load(cache_file) as data:
+            if int(data['version']) != SOLUTION_VERSION:
+                return None
+            values, optimal = data['values'], data['optimal']
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    if values.shape != (NUM_CODES,) or optimal.shape != (NUM_CODES, NUM_CELLS) or optimal.dtype != bool:
+        return None
+    return values, optimal
+
+def load_solution(cache_file: str = CACHE_FILE) -> Tuple[np.ndarray, np.ndarray]:
+    """Load the solved game from cache_file, solving and (re)writing it when it is missing or stale."""
+    cached = _load_cached(cache_file)
+    if cached is not None:
+        return cached
+    values, optimal = solve()
+    from agent.model_file import atomic_write
+    with atomic_write(cache_file) as f:
+        np.savez_compressed(f, version=SOLUTION_VERSION, values=values, optimal=optimal)
+    return values, optimal
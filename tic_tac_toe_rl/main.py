@@ -1,84 +1,225 @@
 import numpy as np
 from game.board import Board
+from game.bitboard import BitBoard
+from game.nk_board import NKBoard
 from game.display import Display
 from agent.agent import Agent
+from agent.nk_agent import NKAgent
+from agent.self_play import batched_self_play
+from agent.parallel_self_play import ParallelSelfPlay
+from agent.policy import PolicyAgent, export_policy
+from agent.checkpoint import BackgroundCheckpointer
+from agent.evaluation import optimal_move_rate
+from game.solver import load_solution
+from utils.profiling import Profiler, hot_paths
+from typing import List, Optional
+import argparse
+import contextlib
+import random
 import time
 import os
 
-def train_agents(episodes: int = 10000) -> None:
-    """Train two agents through self-play."""
-    board = Board()
-    agent_x = Agent(player=1)
-    agent_o = Agent(player=-1)
+def model_file(symbol: str, backend: str, out_dir: str = ".") -> str:
+    """Checkpoint path for agent X or O: binary .qtab for the dense backend, pickle otherwise."""
+    return os.path.join(out_dir, f"agent_{symbol}.qtab" if backend == "dense" else f"agent_{symbol}.pkl")
+
+def policy_file(symbol: str, out_dir: str = ".") -> str:
+    """Path of the compiled inference policy for agent X or O."""
+    return os.path.join(out_dir, f"agent_{symbol}.policy.npy")
+
+def find_model(symbol: str, backend: str, out_dir: str = ".") -> Optional[str]:
+    """Existing checkpoint to load, falling back to a pickle the dense backend can migrate."""
+    for filename in (model_file(symbol, backend, out_dir), os.path.join(out_dir, f"agent_{symbol}.pkl")):
+        if os.path.exists(filename):
+            return filename
+    return None
+
+def print_progress(episode: int, episodes: int, wins_x: int, wins_o: int, draws: int) -> None:
+    """Print the outcome split of all games played so far."""
+    total_games = wins_x + wins_o + draws
+    print(f"\nTraining Progress (Episode {episode}/{episodes})")
+    print(f"X wins: {wins_x/total_games:.2%}")
+    print(f"O wins: {wins_o/total_games:.2%}")
+    print(f"Draws: {draws/total_games:.2%}")
+
+def print_quality(agent_x: Agent, agent_o: Agent, solution) -> None:
+    """Print how often each agent's greedy move is game-theoretically optimal."""
+    print(f"Optimal moves: X {optimal_move_rate(agent_x, solution):.2%} | "
+          f"O {optimal_move_rate(agent_o, solution):.2%}")
+
+def train_agents(episodes: int = 10000, backend: str = "dict", batch_size: int = 0, seed: Optional[int] = None,
+                 workers: int = 0, checkpoint_every: int = 1000, out_dir: str = ".", render: bool = False,
+                 render_delay: float = 0.1, profile: Optional[str] = None) -> None:
+    """Train two agents through self-play using the given Q-table backend ("dict" or "dense").
+
+    A positive batch_size switches to batched self-play (dense backend only), which plays
+    batch_size games in lockstep as NumPy arrays. With workers > 1 the batches are spread
+    over that many processes, whose Q-table deltas are merged after every batch.
+
+    Progress is reported and both agents are checkpointed to out_dir every checkpoint_every
+    games; the files are written from a background thread. With render=True every move of
+    each reported game is printed, pausing render_delay seconds after each one. A profile
+    path turns on the hot-path timers and writes their totals there as JSON at the end.
+    """
+    if batch_size and backend != "dense":
+        raise ValueError("Batched self-play requires backend='dense'")
+    os.makedirs(out_dir, exist_ok=True)
+    board = BitBoard()
+    agent_x = Agent(player=1, backend=backend, seed=seed)
+    agent_o = Agent(player=-1, backend=backend, seed=None if seed is None else seed + 1)
     display = Display()
-    
+    if seed is not None:
+        random.seed(seed)
+
     # Try to load existing models
-    if os.path.exists("agent_x.pkl"):
+    x_file, o_file = model_file("x", backend, out_dir), model_file("o", backend, out_dir)
+    if find_model("x", backend, out_dir):
         print("Loading existing X agent model...")
-        agent_x.load_model("agent_x.pkl")
-    if os.path.exists("agent_o.pkl"):
+        agent_x.load_model(find_model("x", backend, out_dir))
+    if find_model("o", backend, out_dir):
         print("Loading existing O agent model...")
-        agent_o.load_model("agent_o.pkl")
-    
-    print("Training agents through self-play...")
+        agent_o.load_model(find_model("o", backend, out_dir))
+
+    solution = load_solution()
+    profiler = Profiler()
+    if profile:
+        profiler.enable(hot_paths())
+    # Leaving the block restores the profiled functions, even if training fails
+    with BackgroundCheckpointer() as checkpointer, profiler:
+        print("Training agents through self-play...")
+        wins_x = 0
+        wins_o = 0
+        draws = 0
+
+        if batch_size:
+            rng = np.random.default_rng(seed)
+            pool = (ParallelSelfPlay(agent_x, agent_o, workers, sync_every=batch_size, batch_size=batch_size, seed=seed)
+                    if workers > 1 else contextlib.nullcontext())
+            with pool as parallel:
+                chunk = max(checkpoint_every, batch_size * max(workers, 1))
+                for start in range(0, episodes, chunk):
+                    games = min(chunk, episodes - start)
+                    if parallel:
+                        x, o, d = parallel.play(games)
+                    else:
+                        x, o, d = batched_self_play(agent_x, agent_o, games, batch_size, rng)
+                    wins_x, wins_o, draws = wins_x + x, wins_o + o, draws + d
+                    print_progress(start + games, episodes, wins_x, wins_o, draws)
+                    print_quality(agent_x, agent_o, solution)
+                    if parallel:
+                        print("Games/sec per worker: " + ", ".join(f"{rate:,.0f}" for rate in parallel.worker_rates))
+
+                    # Save intermediate models
+                    checkpointer.submit(agent_x, x_file)
+                    checkpointer.submit(agent_o, o_file)
+        else:
+            for episode in range(episodes):
+                board.reset()
+                while not board.is_game_over():
+                    current_agent = agent_x if board.current_player == 1 else agent_o
+
+                    # Get action from current agent
+                    action = current_agent.get_action(board, training=True)
+
+                    # Make move
+                    board.make_move(*action)
+
+                    # Update agent with reward
+                    reward = board.get_reward()
+                    current_agent.update(board, action, reward)
+
+                    if render and episode % checkpoint_every == 0:
+                        display.print_board(board.get_board())
+                        time.sleep(render_delay)
+
+                # Track game outcomes
+                if board.winner == 1:
+                    wins_x += 1
+                elif board.winner == -1:
+                    wins_o += 1
+                else:
+                    draws += 1
+
+                # Print training progress
+                if (episode + 1) % checkpoint_every == 0:
+                    print_progress(episode + 1, episodes, wins_x, wins_o, draws)
+                    print_quality(agent_x, agent_o, solution)
+
+                    # Save intermediate models
+                    checkpointer.submit(agent_x, x_file)
+                    checkpointer.submit(agent_o, o_file)
+
+        # Save final models
+        checkpointer.submit(agent_x, x_file)
+        checkpointer.submit(agent_o, o_file)
+    export_policy(agent_x, policy_file("x", out_dir))
+    export_policy(agent_o, policy_file("o", out_dir))
+    if profile:
+        profiler.dump(profile)
+        print(f"Profile written to {profile}")
+    print("\nTraining completed!")
+
+def train_nk_agents(size: int = 4, k: int = 4, episodes: int = 10000, capacity: int = 1 << 20,
+                    eviction: str = "lru") -> None:
+    """Train two NKAgents through self-play on a size x size board won by k in a row.
+
+    Each agent keeps at most `capacity` Q-rows, evicting old ones once its table fills up.
+    """
+    board = NKBoard(size, k)
+    agent_x = NKAgent(player=1, size=size, capacity=capacity, eviction=eviction)
+    agent_o = NKAgent(player=-1, size=size, capacity=capacity, eviction=eviction)
+    x_file, o_file = f"agent_x_{size}x{size}_{k}.npz", f"agent_o_{size}x{size}_{k}.npz"
+    if os.path.exists(x_file):
+        print("Loading existing X agent model...")
+        agent_x.load_model(x_file)
+    if os.path.exists(o_file):
+        print("Loading existing O agent model...")
+        agent_o.load_model(o_file)
+
+    print(f"Training agents on {size}x{size}, {k} in a row...")
     wins_x = 0
     wins_o = 0
     draws = 0
-    
     for episode in range(episodes):
         board.reset()
         while not board.is_game_over():
             current_agent = agent_x if board.current_player == 1 else agent_o
-            
-            # Get action from current agent
             action = current_agent.get_action(board, training=True)
-            
-            # Make move
             board.make_move(*action)
-            
-            # Update agent with reward
-            reward = board.get_reward()
-            current_agent.update(board, action, reward)
-            
-            if episode % 1000 == 0:
-                display.print_board(board.get_board())
-                time.sleep(0.1)
-        
-        # Track game outcomes
+            current_agent.update(board, action, board.get_reward())
+
         if board.winner == 1:
             wins_x += 1
         elif board.winner == -1:
             wins_o += 1
         else:
             draws += 1
-        
-        # Print training progress
+
         if (episode + 1) % 1000 == 0:
-            total_games = wins_x + wins_o + draws
-            print(f"\nTraining Progress (Episode {episode + 1}/{episodes})")
-            print(f"X wins: {wins_x/total_games:.2%}")
-            print(f"O wins: {wins_o/total_games:.2%}")
-            print(f"Draws: {draws/total_games:.2%}")
-            
-            # Save intermediate models
-            agent_x.save_model("agent_x.pkl")
-            agent_o.save_model("agent_o.pkl")
-    
-    # Save final models
-    agent_x.save_model("agent_x.pkl")
-    agent_o.save_model("agent_o.pkl")
+            print_progress(episode + 1, episodes, wins_x, wins_o, draws)
+            print(f"Stored states: X {len(agent_x.store):,} | O {len(agent_o.store):,} "
+                  f"(evictions: {agent_x.store.evictions + agent_o.store.evictions:,})")
+            agent_x.save_model(x_file)
+            agent_o.save_model(o_file)
+
+    agent_x.save_model(x_file)
+    agent_o.save_model(o_file)
     print("\nTraining completed!")
 
-def play_against_agent() -> None:
+def play_against_agent(backend: str = "dict") -> None:
     """Play against a trained agent."""
     board = Board()
     display = Display()
     
-    # Load trained agent
-    agent = Agent(player=-1)  # Agent plays as O
-    if os.path.exists("agent_o.pkl"):
+    # Load trained agent, preferring the compiled policy
+    agent = Agent(player=-1, backend=backend)  # Agent plays as O
+    if os.path.exists(policy_file("o")):
+        print("Loading compiled O policy...")
+        agent = PolicyAgent(player=-1)
+        agent.load_model(policy_file("o"))
+    elif find_model("o", backend):
         print("Loading trained O agent...")
-        agent.load_model("agent_o.pkl")
+        agent.load_model(find_model("o", backend))
     else:
         print("No trained model found. Please train the agent first.")
         return
@@ -105,7 +246,31 @@ def play_against_agent() -> None:
     
     display.print_game_status(board.get_board(), board.is_game_over(), board.winner)
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line; without a subcommand the interactive menu runs."""
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe with RL")
+    subparsers = parser.add_subparsers(dest="command")
+    train = subparsers.add_parser("train", help="train both agents through self-play without prompts")
+    train.add_argument("--episodes", type=int, default=10000, help="number of self-play games")
+    train.add_argument("--backend", choices=("dict", "dense"), default="dict", help="Q-table backend")
+    train.add_argument("--seed", type=int, default=None, help="random seed")
+    train.add_argument("--checkpoint-every", type=int, default=1000, help="games between progress reports and checkpoints")
+    train.add_argument("--out-dir", default=".", help="directory for checkpoints and compiled policies")
+    train.add_argument("--batch-size", type=int, default=0, help="play this many games in lockstep (dense backend)")
+    train.add_argument("--workers", type=int, default=0, help="self-play processes for batched training")
+    train.add_argument("--render", action="store_true", help="print the moves of each reported game")
+    train.add_argument("--render-delay", type=float, default=0.1, help="seconds to pause after each rendered move")
+    train.add_argument("--profile", metavar="PATH", help="time the hot paths and write the totals to PATH as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.command == "train":
+        train_agents(args.episodes, backend=args.backend, batch_size=args.batch_size, seed=args.seed,
+                     workers=args.workers, checkpoint_every=args.checkpoint_every, out_dir=args.out_dir,
+                     render=args.render, render_delay=args.render_delay, profile=args.profile)
+        return
+
     while True:
         print("\nTic-Tac-Toe with RL")
         print("1. Train new agents")
@@ -116,7 +281,7 @@ def main():
         
         if choice == "1":
             episodes = int(input("Enter number of training episodes (default: 10000): ") or "10000")
-            train_agents(episodes)
+            train_agents(episodes, render=True)
         elif choice == "2":
             play_against_agent()
         elif choice == "3":
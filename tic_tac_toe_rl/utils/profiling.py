@@ -0,0 +1,90 @@
+import functools
+import json
+import time
+from typing import Dict, List, Tuple
+
+class Profiler:
+    """Cumulative wall-clock timers and call counts for selected functions.
+
+    Nothing is wrapped until enable(): it swaps each target for a timing wrapper and
+    disable() puts the originals back, so profiling costs nothing while it is off. Times
+    are inclusive, so a function that calls another profiled one also counts its time.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, List[int]] = {}  # name -> [calls, total nanoseconds]
+        self._patched: List[Tuple[object, str, object, bool]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._patched)
+
+    def enable(self, targets) -> None:
+        """Start timing each (class or module, attribute name) target."""
+        for owner, name in targets:
+            own = name in vars(owner)
+            original = vars(owner)[name] if own else getattr(owner, name)
+            setattr(owner, name, self._wrap(original, f"{getattr(owner, '__name__', owner)}.{name}"))
+            self._patched.append((owner, name, original, own))
+
+    def disable(self) -> None:
+        """Restore the original functions; the collected stats are kept."""
+        for owner, name, original, own in reversed(self._patched):
+            if own:
+                setattr(owner, name, original)
+            else:
+                delattr(owner, name)
+        self._patched.clear()
+
+    def __enter__(self) -> "Profiler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.disable()
+
+    def _wrap(self, func, label: str):
+        if isinstance(func, (staticmethod, classmethod)):
+            return type(func)(self._wrap(func.__func__, label))
+        record = self.stats.setdefault(label, [0, 0])
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record[0] += 1
+                record[1] += perf_counter_ns() - start
+        return timed
+
+    def reset(self) -> None:
+        for record in self.stats.values():
+            record[0] = record[1] = 0
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Stats per function, slowest first."""
+        rows = sorted(self.stats.items(), key=lambda item: -item[1][1])
+        return {name: {"calls": calls, "total_s": total / 1e9, "mean_us": total / calls / 1e3 if calls else 0.0}
+                for name, (calls, total) in rows}
+
+    def dump(self, filename: str) -> None:
+        """Write the report as JSON."""
+        with open(filename, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+def hot_paths() -> List[Tuple[object, str]]:
+    """The self-play hot paths worth timing: state keys, action choice, updates, replay and win checks."""
+    from agent.agent import Agent
+    from agent.q_learning import QLearning
+    from agent.dense_q_learning import DenseQLearning
+    from game.board import Board
+    from game.bitboard import BitBoard
+    return [
+        (Agent, "get_action"), (Agent, "update"),
+        (QLearning, "get_state_key"), (QLearning, "get_action"), (QLearning, "update"),
+        (QLearning, "_update_symmetrical_states"), (QLearning, "_experience_replay"),
+        (DenseQLearning, "get_action"), (DenseQLearning, "update"), (DenseQLearning, "_experience_replay"),
+        (DenseQLearning, "get_actions"), (DenseQLearning, "update_batch"),
+        (Board, "check_game_state"), (BitBoard, "check_game_state"),
+    ]
@@ -1,6 +1,14 @@
 import numpy as np
 from typing import Tuple, List
 
+BOARD_SIZE = 3
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+NUM_CODES = 3 ** NUM_CELLS  # every assignment of {empty, X, O} to the 9 cells
+NUM_SYMMETRIES = 8
+
+# Weight of each cell in the base-3 code; cell i = row * 3 + col is digit i.
+POWERS = 3 ** np.arange(NUM_CELLS, dtype=np.int64)
+
 def get_state_hash(board: np.ndarray) -> str:
     """Convert board state to a unique string hash."""
     return str(board.tolist())
@@ -8,44 +16,141 @@ def get_state_hash(board: np.ndarray) -> str:
 def get_symmetrical_states(board: np.ndarray) -> List[np.ndarray]:
     """Get all symmetrical states of the current board."""
     states = [board]
-    
+
     # Rotate 90 degrees
     states.append(np.rot90(board))
     # Rotate 180 degrees
     states.append(np.rot90(board, 2))
     # Rotate 270 degrees
     states.append(np.rot90(board, 3))
-    
+
     # Flip horizontally
     states.append(np.fliplr(board))
     # Flip vertically
     states.append(np.flipud(board))
-    
+
     # Flip and rotate combinations
     states.append(np.rot90(np.fliplr(board)))
     states.append(np.rot90(np.flipud(board)))
-    
+
     return states
 
 def get_symmetrical_action(action: Tuple[int, int], board_size: int = 3) -> List[Tuple[int, int]]:
-    """Get all symmetrical actions for a given action."""
+    """Get all symmetrical actions for a given action, matching the order of get_symmetrical_states."""
     row, col = action
     actions = [(row, col)]
-    
-    # Rotate 90 degrees
-    actions.append((col, board_size - 1 - row))
+
+    # Rotate 90 degrees (np.rot90 is counter-clockwise)
+    actions.append((board_size - 1 - col, row))
     # Rotate 180 degrees
     actions.append((board_size - 1 - row, board_size - 1 - col))
     # Rotate 270 degrees
-    actions.append((board_size - 1 - col, row))
-    
+    actions.append((col, board_size - 1 - row))
+
     # Flip horizontally
     actions.append((row, board_size - 1 - col))
     # Flip vertically
     actions.append((board_size - 1 - row, col))
-    
+
     # Flip and rotate combinations
     actions.append((col, row))
     actions.append((board_size - 1 - col, board_size - 1 - row))
-    
-    return actions 
\ No newline at end of file
+
+    return actions
+
+def encode_board(board: np.ndarray) -> int:
+    """Encode a board as a base-3 integer (empty=0, X=1, O=2)."""
+    return int(np.dot(np.asarray(board).ravel() % 3, POWERS))
+
+def encode_boards(boards: np.ndarray) -> np.ndarray:
+    """Encode a batch of boards shaped (N, 3, 3) or (N, 9) into base-3 codes."""
+    boards = np.asarray(boards).reshape(-1, NUM_CELLS)
+    return (boards % 3).astype(np.int64) @ POWERS
+
+def decode_board(code: int) -> np.ndarray:
+    """Decode a base-3 integer back into a 3x3 board of 0/1/-1."""
+    digits = (int(code) // POWERS) % 3
+    return np.where(digits == 2, -1, digits).reshape(BOARD_SIZE, BOARD_SIZE)
+
+def action_to_index(action: Tuple[int, int]) -> int:
+    """Convert a (row, col) action into a flat cell index."""
+    return action[0] * BOARD_SIZE + action[1]
+
+def index_to_action(index: int) -> Tuple[int, int]:
+    """Convert a flat cell index into a (row, col) action."""
+    return divmod(int(index), BOARD_SIZE)
+
+def _build_symmetry_tables():
+    """Build the code/action symmetry tables once at import."""
+    cells = np.arange(NUM_CELLS).reshape(BOARD_SIZE, BOARD_SIZE)
+    # board_permutations[k, j]: cell of the original board that lands on cell j under symmetry k
+    board_permutations = np.array([s.ravel() for s in get_symmetrical_states(cells)])
+    # action_permutations[k, i]: cell that original cell i is moved to under symmetry k
+    action_permutations = np.argsort(board_permutations, axis=1)
+
+    codes = np.arange(NUM_CODES, dtype=np.int64)
+    digits = (codes[:, None] // POWERS) % 3
+    symmetric_codes = np.stack([digits[:, perm] @ POWERS for perm in board_permutations], axis=1)
+    canonical_symmetry = np.argmin(symmetric_codes, axis=1)
+    canonical_codes = symmetric_codes[codes, canonical_symmetry]
+    return (board_permutations, action_permutations, symmetric_codes,
+            canonical_codes, canonical_symmetry.astype(np.int8))
+
+(BOARD_PERMUTATIONS, ACTION_PERMUTATIONS, SYMMETRIC_CODES,
+ CANONICAL_CODES, CANONICAL_SYMMETRY) = _build_symmetry_tables()
+
+# Per-code cell permutations into and out of the canonical frame: a move on cell i of
+# the board with code c is the move on cell TO_CANONICAL[c, i] of the canonical board.
+TO_CANONICAL = ACTION_PERMUTATIONS[CANONICAL_SYMMETRY]
+FROM_CANONICAL = np.argsort(TO_CANONICAL, axis=1)
+
+def get_canonical(board: np.ndarray) -> Tuple[int, int]:
+    """Return (canonical code, symmetry index) for a board."""
+    code = encode_board(board)
+    return int(CANONICAL_CODES[code]), int(CANONICAL_SYMMETRY[code])
+
+# The 8 winning lines as flat cell indices: rows, columns, then the two diagonals.
+WIN_LINES = np.array([[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                      [0, 3, 6], [1, 4, 7], [2, 5, 8],
+                      [0, 4, 8], [2, 4, 6]])
+
+def _build_state_tables():
+    """Enumerate every reachable position and index the canonical ones."""
+    digits = (np.arange(NUM_CODES, dtype=np.int64)[:, None] // POWERS) % 3
+    lines = digits[:, WIN_LINES]
+    x_wins = np.all(lines == 1, axis=2).any(axis=1)
+    o_wins = np.all(lines == 2, axis=2).any(axis=1)
+    winners = np.where(x_wins, 1, np.where(o_wins, -1, 0)).astype(np.int8)
+    terminal = x_wins | o_wins | np.all(digits != 0, axis=1)
+
+    # Breadth-first over plies: X places 1s on even plies, O places 2s on odd plies
+    reachable = np.zeros(NUM_CODES, dtype=bool)
+    frontier = np.array([0], dtype=np.int64)
+    reachable[0] = True
+    for ply in range(NUM_CELLS):
+        frontier = frontier[~terminal[frontier]]
+        empty = digits[frontier] == 0
+        parents, cells = np.nonzero(empty)
+        frontier = np.unique(frontier[parents] + (1 + ply % 2) * POWERS[cells])
+        reachable[frontier] = True
+
+    states = np.unique(CANONICAL_CODES[reachable])
+    state_index = np.full(NUM_CODES, -1, dtype=np.int32)
+    state_index[states] = np.arange(len(states), dtype=np.int32)
+    legal = (digits[states] == 0) & ~terminal[states, None]
+    return reachable, terminal, winners, states, state_index, legal
+
+REACHABLE, TERMINAL, WINNERS, CANONICAL_STATES, STATE_INDEX, LEGAL_MASKS = _build_state_tables()
+NUM_STATES = len(CANONICAL_STATES)
+
+def _build_equivalent_actions() -> np.ndarray:
+    """EQUIVALENT_ACTIONS[s, a, b]: cells a and b are interchangeable in canonical state s
+    because some symmetry maps the position onto itself and cell a onto cell b."""
+    self_symmetric = SYMMETRIC_CODES[CANONICAL_STATES] == CANONICAL_STATES[:, None]
+    equivalent = np.zeros((NUM_STATES, NUM_CELLS, NUM_CELLS), dtype=bool)
+    for k in range(NUM_SYMMETRIES):
+        rows = np.flatnonzero(self_symmetric[:, k])
+        equivalent[rows[:, None], np.arange(NUM_CELLS), ACTION_PERMUTATIONS[k]] = True
+    return equivalent
+
+EQUIVALENT_ACTIONS = _build_equivalent_actions()